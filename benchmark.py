@@ -0,0 +1,243 @@
+# Benchmark harness for the dashboard pipeline on synthetic scale-out ontologies
+#
+# Starts from RiskOnto_v1.owl, adds synthetic Controls, Tools, Assets and
+# Threats, and times every dashboard stage on fresh (uncached) objects:
+# parse, graph-explorer build, mapped-mitigation table, compliance,
+# risk/alerts and the heatmap pivot. Each stage records wall time and peak
+# traced memory; results are written as JSON so runs can be compared between
+# releases.
+#
+#   python benchmark.py --tools 500 --assets 200 --threats 1000 --scale 1,4 --out bench.json
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import rdflib
+from rdflib import Graph, Literal, RDF, RDFS, XSD
+
+from ontology_index import NIST, OntologyIndex
+
+SEVERITIES = ("Low", "Medium", "High")
+CATALOG_CONTROLS = 300  # about the size of the shipped control catalog
+
+
+def synthesize(base, tools=100, assets=50, threats=200, controls=0, density=0.3,
+               targets_per_asset=3, mitigations_per_control=2, seed=0):
+    """Return a copy of ``base`` grown with synthetic individuals."""
+    rng = random.Random(seed)
+    g = Graph()
+    for prefix, uri in base.namespaces():
+        g.bind(prefix, uri)
+    g.addN((s, p, o, g) for s, p, o in base)
+
+    # Synthetic controls hang off the base's SubCategories and techniques;
+    # a base without any gets a synthetic CSF slice to attach them to
+    subcats = list(g.subjects(RDF.type, NIST.SubCategory))
+    techniques = list(dict.fromkeys(g.objects(None, NIST.hasMitigation)))
+    if controls and not subcats:
+        for i in range(max(1, controls // 10)):
+            sc = NIST[f"SynthSubCategory_{i}"]
+            g.add((sc, RDF.type, NIST.SubCategory))
+            g.add((sc, RDFS.label, Literal(f"SX.SC-{i:02d}")))
+            subcats.append(sc)
+    if controls and not techniques:
+        for i in range(max(1, controls // 5)):
+            t = NIST[f"SynthTechnique_{i}"]
+            g.add((t, RDFS.label, Literal(f"Synthetic Technique {i}")))
+            techniques.append(t)
+    for i in range(controls):
+        c = NIST[f"SynthControl_{i}"]
+        g.add((c, RDF.type, NIST.Control))
+        g.add((c, RDFS.label, Literal(f"SX-{i}")))
+        g.add((rng.choice(subcats), NIST.hasControl, c))
+        for t in rng.sample(techniques, min(mitigations_per_control, len(techniques))):
+            g.add((c, NIST.hasMitigation, t))
+
+    all_controls = list(g.subjects(RDF.type, NIST.Control))
+    for i in range(tools):
+        t = NIST[f"SynthTool_{i}"]
+        g.add((t, RDF.type, NIST.Tool))
+        g.add((t, RDFS.label, Literal(f"Synthetic Tool {i}")))
+        k = int(len(all_controls) * density)
+        for c in rng.sample(all_controls, k):
+            g.add((t, NIST.implementsControl, c))
+
+    threat_nodes = []
+    for i in range(threats):
+        th = NIST[f"SynthThreat_{i}"]
+        likelihood = round(rng.random(), 2)
+        impact = rng.randint(1, 5)
+        g.add((th, RDF.type, NIST.Threat))
+        g.add((th, RDFS.label, Literal(f"Synthetic Threat {i}")))
+        g.add((th, NIST.severityLevel, Literal(rng.choice(SEVERITIES))))
+        g.add((th, NIST.likelihood, Literal(likelihood, datatype=XSD.float)))
+        g.add((th, NIST.impact, Literal(impact, datatype=XSD.integer)))
+        g.add((th, NIST.riskScore, Literal(round(likelihood * impact * 2, 2), datatype=XSD.float)))
+        threat_nodes.append(th)
+    for i in range(assets):
+        a = NIST[f"SynthAsset_{i}"]
+        g.add((a, RDF.type, NIST.Asset))
+        g.add((a, RDFS.label, Literal(f"Synthetic Asset {i}")))
+        for th in rng.sample(threat_nodes, min(targets_per_asset, len(threat_nodes))):
+            g.add((a, NIST.isTargetedBy, th))
+    return g
+
+
+def measure(fn, repeat=1):
+    # tracemalloc slows allocation-heavy code several-fold, so wall time comes
+    # from untraced runs and peak memory from one extra traced run.
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, {
+        "seconds": statistics.median(times),
+        "seconds_min": min(times),
+        "peak_bytes": peak,
+        "repeat": repeat,
+    }
+
+
+def run_stages(g, parse_format="xml", repeat=1):
+    from compliance import ComplianceEngine
+    from graph_layout import ExplorerLayout, ROOT, render_html
+    from reports import mapped_mitigations
+    from risk import build_risk_tables, build_threat_frame
+
+    results = {}
+    with tempfile.NamedTemporaryFile(suffix=f".{parse_format}", delete=False) as tmp:
+        path = tmp.name
+    try:
+        g.serialize(path, format=parse_format, encoding="utf-8")
+        g, results["parse"] = measure(lambda: Graph().parse(path, format=parse_format), repeat)
+    finally:
+        os.remove(path)
+
+    idx, results["index"] = measure(lambda: OntologyIndex(g), repeat)
+
+    def explorer():
+        layout = ExplorerLayout(idx)
+        nodes, edges, _ = layout.view(ROOT)
+        html = render_html(nodes, edges)
+        for function in layout.functions():
+            for category in layout.categories(function)[:1]:
+                layout.view(category)
+        return html
+    _, results["graph_explorer"] = measure(explorer, repeat)
+
+    _, results["mapped_mitigations"] = measure(lambda: mapped_mitigations(idx), repeat)
+
+    def compliance():
+        engine = ComplianceEngine(idx)
+        engine.summary_frame()
+        engine.recommendation_frame()
+        engine.score_frame()
+        return engine
+    engine, results["compliance"] = measure(compliance, repeat)
+
+    def risk():
+        threats = build_threat_frame(g, idx)
+        return build_risk_tables(threats, engine.tool_labels, engine.scores)
+    (df_risk, _), results["risk_alerts"] = measure(risk, repeat)
+
+    def heatmap():
+        if df_risk.empty:
+            return df_risk
+        return df_risk.pivot_table(index="Tool", columns="Asset", values="Risk Score", aggfunc="sum", fill_value=0)
+    _, results["heatmap_pivot"] = measure(heatmap, repeat)
+
+    sizes = {
+        "triples": len(g),
+        "tools": len(engine.tools),
+        "controls": len(engine.controls),
+        "techniques": len(engine.techniques),
+        "risk_rows": len(df_risk),
+    }
+    return results, sizes
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the RiskOnto dashboard stages on synthetic ontologies.")
+    parser.add_argument("--ontology", default="RiskOnto_v1.owl")
+    parser.add_argument("--tools", type=int, default=100)
+    parser.add_argument("--assets", type=int, default=50)
+    parser.add_argument("--threats", type=int, default=200)
+    parser.add_argument("--controls", type=int, default=CATALOG_CONTROLS, help="synthetic controls added to the catalog")
+    parser.add_argument("--density", type=float, default=0.3, help="share of controls each tool implements")
+    parser.add_argument("--targets-per-asset", type=int, default=3)
+    parser.add_argument("--scale", default="1", help="comma-separated multipliers for the entity counts")
+    parser.add_argument("--parse-format", default="xml", choices=("xml", "nt", "turtle"))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench.json")
+    args = parser.parse_args(argv)
+
+    from ontology_loader import load_ontology
+
+    base = load_ontology(args.ontology)
+    if next(base.subjects(RDF.type, NIST.Control), None) is None:
+        # e.g. the shipped OWL, whose classes live in another namespace; time
+        # a synthetic catalog rather than an empty one
+        args.controls = args.controls or CATALOG_CONTROLS
+        print(f"warning: {args.ontology} has no {NIST.Control} individuals (is its namespace {NIST}?); "
+              f"synthesizing a catalog of {args.controls} controls", file=sys.stderr)
+    runs = []
+    for scale in (float(s) for s in args.scale.split(",")):
+        params = {
+            "tools": int(args.tools * scale),
+            "assets": int(args.assets * scale),
+            "threats": int(args.threats * scale),
+            "controls": int(args.controls * scale),
+            "density": args.density,
+            "targets_per_asset": args.targets_per_asset,
+            "seed": args.seed,
+        }
+        g = synthesize(base, **params)
+        stages, sizes = run_stages(g, args.parse_format, args.repeat)
+        runs.append({"scale": scale, "params": params, "sizes": sizes, "stages": stages})
+        line = ", ".join(f"{name}={r['seconds'] * 1000:.1f}ms" for name, r in stages.items())
+        print(f"scale {scale:g} ({sizes['triples']} triples): {line}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "rdflib": rdflib.__version__,
+            "platform": platform.platform(),
+            "ontology": args.ontology,
+            "parse_format": args.parse_format,
+        },
+        "runs": runs,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+# Vectorized tool compliance engine
+#
+# implementsControl is encoded as a sparse tools x controls boolean matrix and
+# hasMitigation as a sparse controls x techniques matrix. Scores, gaps and
+# recommended techniques for every tool then come from a row sum and a single
+# sparse product instead of per-tool set arithmetic.
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from ontology_index import NIST, per_index_cache
+
+
+def _incidence(rows, cols, shape):
+    data = np.ones(len(rows), dtype=np.int32)
+    m = sparse.csr_matrix((data, (rows, cols)), shape=shape)
+    m.data[:] = 1  # collapse duplicate edges
+    return m
+
+
+class ComplianceEngine:
+    def __init__(self, idx, tools=None):
+        self.idx = idx
+        self.tools = list(idx.of_type(NIST.Tool) if tools is None else tools)
+        self.controls = list(dict.fromkeys(idx.of_type(NIST.Control)))
+        control_pos = {c: i for i, c in enumerate(self.controls)}
+
+        rows, cols = [], []
+        for i, tool in enumerate(self.tools):
+            for c in idx.objects(tool, NIST.implementsControl):
+                j = control_pos.get(c)
+                if j is not None:
+                    rows.append(i)
+                    cols.append(j)
+        self.implements = _incidence(rows, cols, (len(self.tools), len(self.controls)))
+
+        techniques = {}
+        rows, cols = [], []
+        for j, c in enumerate(self.controls):
+            for t in idx.objects(c, NIST.hasMitigation):
+                rows.append(j)
+                cols.append(techniques.setdefault(t, len(techniques)))
+        self.techniques = list(techniques)
+        self.mitigation = _incidence(rows, cols, (len(self.controls), len(self.techniques)))
+
+        n_controls = len(self.controls)
+        self.passed = np.asarray(self.implements.sum(axis=1)).ravel()
+        self.failed = n_controls - self.passed
+        self.scores = self.passed / n_controls * 100 if n_controls else np.zeros(len(self.tools))
+        # Missing controls; dense is fine at tools x ~hundreds of controls
+        self.missing = sparse.csr_matrix(self.implements.toarray() == 0, dtype=np.int32)
+        # tools x techniques: how many missing controls each technique mitigates
+        self.recommended = self.missing @ self.mitigation
+
+        self.tool_labels = np.array([str(idx.label(t)) for t in self.tools], dtype=object)
+        self.control_names = np.array([c.split("#")[-1] for c in self.controls], dtype=object)
+        self.control_labels = np.array([str(idx.label(c)) for c in self.controls], dtype=object)
+        self.technique_labels = np.array([str(idx.label(t)) for t in self.techniques], dtype=object)
+
+    def tool_rows(self, tool_filter):
+        if tool_filter in (None, "All"):
+            return np.arange(len(self.tools))
+        return np.flatnonzero(self.tool_labels == tool_filter)
+
+    def score_frame(self, tool_filter="All"):
+        rows = self.tool_rows(tool_filter)
+        return pd.DataFrame({
+            "Tool": self.tool_labels[rows],
+            "Score (%)": np.round(self.scores[rows], 2),
+            "Passed": self.passed[rows],
+            "Failed": self.failed[rows],
+        })
+
+    def summary_frame(self, tool_filter="All"):
+        summary = []
+        for i in self.tool_rows(tool_filter):
+            compliant = self.control_names[self.implements[i].indices]
+            missing = self.control_names[self.missing[i].indices]
+            techs = self.technique_labels[self.recommended[i].indices]
+            summary.append({
+                "Tool": self.tool_labels[i],
+                "Compliant With": ", ".join(sorted(compliant)) or "None",
+                "Non-Compliant With": ", ".join(sorted(missing)) or "None",
+                "Recommended Mitigations": ", ".join(sorted(set(techs))) or "None",
+            })
+        return pd.DataFrame(summary)
+
+    def recommendation_frame(self, tool_filter="All"):
+        # Expand every (tool, missing control) pair into its hasMitigation
+        # techniques using the CSR row pointers of the mitigation matrix.
+        rows = self.tool_rows(tool_filter)
+        missing = self.missing[rows].tocoo()
+        tool_idx = rows[missing.row]
+        ctrl = missing.col
+        indptr = self.mitigation.indptr
+        counts = indptr[ctrl + 1] - indptr[ctrl]
+        total = int(counts.sum())
+        if total == 0:
+            return pd.DataFrame(columns=["Tool", "Missing Control", "Suggested Technique", "Explanation"])
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        tech = self.mitigation.indices[np.repeat(indptr[ctrl], counts) + offsets]
+        df = pd.DataFrame({
+            "Tool": self.tool_labels[np.repeat(tool_idx, counts)],
+            "Missing Control": self.control_labels[np.repeat(ctrl, counts)],
+            "Suggested Technique": self.technique_labels[tech],
+        })
+        df["Explanation"] = (
+            df["Tool"] + " lacks NIST control " + df["Missing Control"]
+            + ", which is mitigated by " + df["Suggested Technique"] + " of the D3fend Technique."
+        )
+        return df
+
+
+@per_index_cache
+def get_engine(idx):
+    return ComplianceEngine(idx)
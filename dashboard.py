@@ -3,13 +3,17 @@ import streamlit as st
 from pyvis.network import Network
 import tempfile
 import os
-from rdflib import Graph, Namespace, RDF, RDFS, Literal, SKOS
+from rdflib import Namespace, RDF, RDFS, Literal, SKOS
 import pandas as pd
 import plotly.express as px
+from ontology_loader import load_ontology
+from instrumentation import PerfRecorder, instrument_graph
+
+perf = PerfRecorder("dashboard")
 
 # Load ontology
-g = Graph()
-g.parse("backup.owl", format="xml")
+perf.begin("ontology_load")
+g = instrument_graph(load_ontology("backup.owl", format="xml"))
 
 # Namespaces
 NIST = Namespace("http://example.org/riskonto#")
@@ -25,6 +29,7 @@ st.title("🛡️ RiskOnto Compliance & Risk Dashboard")
 # -------------------------
 # Ontology Graph Explorer
 # -------------------------
+perf.begin("graph_build")
 st.subheader("🔗 RiskOnto Graph Explorer")
 st.caption("Explore Subcategory → Control → D3FEND Technique relationships")
 
@@ -63,6 +68,7 @@ for subcat in g.subjects(RDF.type, NIST.SubCategory):
                 net.add_edge(c_label, t_label)
                 added_nodes.add(t_label)
 
+perf.begin("save_graph")
 with tempfile.NamedTemporaryFile(delete=False, suffix=".html") as tmp:
     net.save_graph(tmp.name)
     html = open(tmp.name, 'r', encoding='utf-8').read()
@@ -70,6 +76,7 @@ os.remove(tmp.name)
 st.components.v1.html(html, height=750, scrolling=True)
 
 # Mapped Mitigations
+perf.begin("mapped_mitigations")
 st.subheader("🧩 Mapped Mitigations")
 mapped = []
 for control, _, tech in g.triples((None, NIST.hasMitigation, None)):
@@ -99,6 +106,7 @@ st.bar_chart(df["D3FEND Technique"].value_counts())
 # -------------------------
 # Tool Compliance
 # -------------------------
+perf.begin("compliance")
 
 # Extract tools
 tools = sorted([str(next(g.objects(t, RDFS.label), t.split("#")[-1])) for t in g.subjects(RDF.type, NIST.Tool)])
@@ -148,6 +156,7 @@ else:
 # -------------------------
 # Risk Analysis & Heatmap
 # -------------------------
+perf.begin("risk")
 risk_data = []
 compliance_rows = []
 alerts = []
@@ -216,6 +225,7 @@ if not filtered_risk.empty and "Severity" in filtered_risk.columns:
 st.dataframe(filtered_risk)
 
 # Heatmap
+perf.begin("heatmap")
 st.subheader("🔥 Threat Heatmap: Tool × Asset × Risk")
 if not filtered_risk.empty and "Tool" in filtered_risk.columns and "Asset" in filtered_risk.columns:
     heatmap_df = filtered_risk.pivot_table(index="Tool", columns="Asset", values="Risk Score", aggfunc="sum", fill_value=0)
@@ -227,3 +237,12 @@ st.download_button("📥 Download Risk CSV", filtered_risk.to_csv(index=False).e
 st.download_button("📥 Download Compliance CSV", df_compliance.to_csv(index=False).encode("utf-8"), "compliance_scores.csv")
 if not df_alerts.empty:
     st.download_button("📥 Download Alert Summary", df_alerts.to_csv(index=False).encode("utf-8"), "compliance_risk_alerts.csv")
+
+# -------------------------
+# Performance
+# -------------------------
+perf.end()
+with st.sidebar.expander("⏱️ Performance", expanded=False):
+    st.caption(f"Rerun {perf.run_id}: {perf.total_ms():.0f} ms total")
+    st.dataframe(perf.frame(), hide_index=True, use_container_width=True)
+perf.write()
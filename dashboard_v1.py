@@ -1,15 +1,31 @@
 # ✅ Final working dashboard.py
 import streamlit as st
 from pyvis.network import Network
-import tempfile
-import os
-from rdflib import Graph, Namespace, RDF, RDFS, Literal, SKOS, URIRef
-import pandas as pd
-import plotly.express as px
+from rdflib import Namespace
+from ontology_index import clean_label, is_valid_uri
+from ontology_service import get_ontology_service
+from compliance import get_engine
+from inference import get_materializer
+from rollups import get_rollup
+from optimizer import get_optimizer
+from queries import scalar, select
+from mitigation_filters import CONTROL, SUBCATEGORY, TECHNIQUE, get_mitigation_filters
+from risk import build_risk_tables, get_threat_frame
+from risk_simulation import get_simulator
+from graph_layout import ROOT, get_layout
+from export_static import get_artifacts, heatmap_figure
+from instrumentation import PerfRecorder, instrument_graph
+
+perf = PerfRecorder("dashboard_v1")
 
 # Load Ontology
-g = Graph()
-g.parse("RiskOnto_v1.owl", format="xml")
+perf.begin("ontology_load")
+# Derived compliance triples are built when a revision is published, not on a rerun
+ontology = get_ontology_service("RiskOnto_v1.owl", format="xml",
+                                prepare=[lambda snapshot: get_materializer(snapshot.graph)])
+snapshot = ontology.pin(st.session_state)
+g = instrument_graph(snapshot.graph)
+perf.context["ontology_version"] = snapshot.version
 
 # Namespaces
 NIST = Namespace("http://example.org/riskonto#")
@@ -18,154 +34,122 @@ SKOS = Namespace("http://www.w3.org/2004/02/skos/core#")
 g.bind("nist", NIST)
 g.bind("d3fend", D3F)
 g.bind("skos", SKOS)
-
-# Clean helper
-def clean_label(label):
-    if isinstance(label, Literal):
-        label = str(label)
-    return label.replace("Subcategory for ", "").strip()
-
-def is_valid_uri(uri):
-    return isinstance(uri, URIRef) and " " not in uri and "," not in uri
+idx = snapshot.index
+artifacts = get_artifacts(snapshot.digest)  # pre-rendered by export_static.py, if any
 
 # Streamlit Config
 st.set_page_config(layout="wide")
 st.title("🛡️ RiskOnto Compliance & Risk Dashboard")
 
+latest = ontology.current()
+if latest.version != snapshot.version:
+    st.sidebar.info(f"Ontology updated to v{latest.version}; this session is still on v{snapshot.version}.")
+    if st.sidebar.button("🔄 Switch to latest ontology"):
+        ontology.unpin(st.session_state)
+        st.rerun()
+
 # -------------------------
 # Graph Explorer
 # -------------------------
+perf.begin("graph_explorer")
 st.subheader("🔗 RiskOnto Graph Explorer")
-net = Network(height="700px", width="100%", bgcolor="#111111", font_color="white")
-net.set_options("""
-var options = {
-  "interaction": {"navigationButtons": true},
-  "physics": {
-    "forceAtlas2Based": {
-      "gravitationalConstant": -30,
-      "springLength": 90,
-      "springConstant": 0.04
-    },
-    "minVelocity": 0.75,
-    "solver": "forceAtlas2Based"
-  }
-}
-""")
-
-added_nodes = set()
-for subcat in g.subjects(RDF.type, NIST.SubCategory):
-    if not is_valid_uri(subcat): continue
-    subcat_label = clean_label(next(g.objects(subcat, RDFS.label), subcat.split("#")[-1]))
-    if subcat_label not in added_nodes:
-        net.add_node(subcat_label, label=subcat_label, color="#1f77b4", shape="box")
-        added_nodes.add(subcat_label)
-    for control in g.objects(subcat, NIST.hasControl):
+explorer_mode = st.radio("Explorer mode", ["Focused (precomputed layout)", "Full graph (live physics)"], horizontal=True)
+
+if explorer_mode.startswith("Focused"):
+    layout = get_layout(idx)
+    ecol1, ecol2, ecol3 = st.columns(3)
+    functions = layout.functions()
+    with ecol1:
+        focus_function = st.selectbox("Function", [None] + functions, format_func=lambda n: "All Functions" if n is None else layout.labels[n])
+    categories = layout.categories(focus_function) if focus_function is not None else []
+    with ecol2:
+        focus_category = st.selectbox("Category", [None] + categories, format_func=lambda n: "All Categories" if n is None else layout.labels[n])
+    with ecol3:
+        max_nodes = st.slider("Max nodes", 50, 1000, 300, step=50)
+    focus = focus_category or focus_function or ROOT
+    prebuilt = artifacts.explorer_html(focus) if artifacts and max_nodes == artifacts.max_nodes else None
+    html_content, shown, hidden = prebuilt or layout.html(focus, max_nodes)
+    if hidden:
+        st.caption(f"Showing {shown} nodes; {hidden} more hidden by the node cap. Pick a Category to drill down.")
+else:
+    net = Network(height="700px", width="100%", bgcolor="#111111", font_color="white")
+    net.set_options("""
+    var options = {
+      "interaction": {"navigationButtons": true},
+      "physics": {
+        "forceAtlas2Based": {
+          "gravitationalConstant": -30,
+          "springLength": 90,
+          "springConstant": 0.04
+        },
+        "minVelocity": 0.75,
+        "solver": "forceAtlas2Based"
+      }
+    }
+    """)
+
+    added_nodes, added_edges = set(), set()
+    edges = select(g, "explorer_edges", snapshot.digest)
+    for subcat, control, tech in edges.itertuples(index=False):
+        if not is_valid_uri(subcat): continue
+        subcat_label = clean_label(idx.label(subcat))
+        if subcat_label not in added_nodes:
+            net.add_node(subcat_label, label=subcat_label, color="#1f77b4", shape="box")
+            added_nodes.add(subcat_label)
         if not is_valid_uri(control): continue
-        control_label = clean_label(next(g.objects(control, RDFS.label), control.split("#")[-1]))
+        control_label = clean_label(idx.label(control))
         if control_label not in added_nodes:
             net.add_node(control_label, label=control_label, color="#ff7f0e", shape="ellipse")
             added_nodes.add(control_label)
-        net.add_edge(subcat_label, control_label)
-        for tech in g.objects(control, NIST.hasMitigation):
-            if not is_valid_uri(tech): continue
-            tech_label = clean_label(next(g.objects(tech, RDFS.label), tech.split("#")[-1]))
-            if tech_label not in added_nodes:
-                net.add_node(tech_label, label=tech_label, color="#2ca02c", shape="diamond")
-                added_nodes.add(tech_label)
-            net.add_edge(control_label, tech_label)
-
-with tempfile.NamedTemporaryFile(delete=False, suffix=".html") as tmp_file:
-    net.save_graph(tmp_file.name)
-    tmp_path = tmp_file.name
-with open(tmp_path, "r", encoding="utf-8") as f:
-    html_content = f.read()
+        if (subcat_label, control_label) not in added_edges:
+            net.add_edge(subcat_label, control_label)
+            added_edges.add((subcat_label, control_label))
+        if not is_valid_uri(tech): continue
+        tech_label = clean_label(idx.label(tech))
+        if tech_label not in added_nodes:
+            net.add_node(tech_label, label=tech_label, color="#2ca02c", shape="diamond")
+            added_nodes.add(tech_label)
+        net.add_edge(control_label, tech_label)
+
+    html_content = net.generate_html()
 st.components.v1.html(html_content, height=750, scrolling=True)
 st.download_button("📥 Download Graph HTML", data=html_content, file_name="ontology_graph.html")
-os.remove(tmp_path)
 
 # -------------------------
 # Mapped Mitigations Table
 # -------------------------
+perf.begin("mapped_mitigations")
 st.subheader("🧩 Mapped Mitigations")
-triples = list(g.triples((None, NIST.hasMitigation, None)))
-st.code(f"🔍 Total hasMitigation triples: {len(triples)}")
-
-mapped = []
-for control, _, technique in triples:
-    if not (is_valid_uri(control) and is_valid_uri(technique)):
-        continue
-    subcat = next(g.subjects(NIST.hasControl, control), None)
-    if not subcat or not is_valid_uri(subcat):
-        continue
-    subcat_label = clean_label(next(g.objects(subcat, RDFS.label), subcat.split("#")[-1]))
-    control_label = clean_label(next(g.objects(control, RDFS.label), control.split("#")[-1]))
-    technique_label = clean_label(next(g.objects(technique, RDFS.label), technique.split("#")[-1]))
-    mapped.append({
-        "NIST Subcategory": subcat_label,
-        "NIST Control": control_label,
-        "D3FEND Technique": technique_label
-    })
+st.code(f"🔍 Total hasMitigation triples: {scalar(g, 'mitigation_count', snapshot.digest)}")
 
-df_mapped = pd.DataFrame(mapped).drop_duplicates()
+mapped_filters = get_mitigation_filters(idx)
 
 # Filter UI
 col1, col2, col3 = st.columns(3)
 with col1:
-    selected_subcat = st.selectbox("🔎 Filter by Subcategory", ["All"] + sorted(df_mapped["NIST Subcategory"].unique()))
+    selected_subcat = st.selectbox("🔎 Filter by Subcategory", mapped_filters.options(SUBCATEGORY))
 with col2:
-    selected_control = st.selectbox("🎛 Filter by Control", ["All"] + sorted(df_mapped["NIST Control"].unique()))
+    selected_control = st.selectbox("🎛 Filter by Control", mapped_filters.options(CONTROL))
 with col3:
-    selected_tech = st.selectbox("🛡️ Filter by Technique", ["All"] + sorted(df_mapped["D3FEND Technique"].unique()))
+    selected_tech = st.selectbox("🛡️ Filter by Technique", mapped_filters.options(TECHNIQUE))
 
-filtered = df_mapped.copy()
-if selected_subcat != "All":
-    filtered = filtered[filtered["NIST Subcategory"] == selected_subcat]
-if selected_control != "All":
-    filtered = filtered[filtered["NIST Control"] == selected_control]
-if selected_tech != "All":
-    filtered = filtered[filtered["D3FEND Technique"] == selected_tech]
+filtered, control_counts, tech_counts = mapped_filters.view(selected_subcat, selected_control, selected_tech)
 
 st.dataframe(filtered, use_container_width=True)
-st.bar_chart(filtered["NIST Control"].value_counts())
-st.bar_chart(filtered["D3FEND Technique"].value_counts())
+st.bar_chart(control_counts)
+st.bar_chart(tech_counts)
 # -------------------------
 # Tool Compliance
 # -------------------------
+perf.begin("compliance")
 
 # Extract tools
-tools = sorted([str(next(g.objects(t, RDFS.label), t.split("#")[-1])) for t in g.subjects(RDF.type, NIST.Tool)])
+tools = sorted(str(idx.label(t)) for t in select(g, "tools", snapshot.digest)["tool"])
 tool_filter = st.sidebar.selectbox("🔧 Select Tool", ["All"] + tools)
 
-controls = list(g.subjects(RDF.type, NIST.Control))
-compliance_summary = []
-recommendations = []
-
-for tool in g.subjects(RDF.type, NIST.Tool):
-    tool_label = next(g.objects(tool, RDFS.label), tool.split("#")[-1])
-    if tool_filter != "All" and tool_label != tool_filter:
-        continue
-    compliant = set(g.objects(tool, NIST.implementsControl))
-    missing = set(controls) - compliant
-    rec_techs = [next(g.objects(t, RDFS.label), t.split("#")[-1]) for m in missing for t in g.objects(m, NIST.hasMitigation)]
-    compliance_summary.append({
-        "Tool": tool_label,
-        "Compliant With": ", ".join(sorted([c.split("#")[-1] for c in compliant])) or "None",
-        "Non-Compliant With": ", ".join(sorted([m.split("#")[-1] for m in missing])) or "None",
-        "Recommended Mitigations": ", ".join(sorted(set(rec_techs))) or "None"
-    })
-    for m in missing:
-        m_label = next(g.objects(m, RDFS.label), m.split("#")[-1])
-        for t in g.objects(m, NIST.hasMitigation):
-            t_label = next(g.objects(t, RDFS.label), t.split("#")[-1])
-            recommendations.append({
-                "Tool": tool_label,
-                "Missing Control": m_label,
-                "Suggested Technique": t_label,
-                "Explanation": f"{tool_label} lacks NIST control {m_label}, which is mitigated by {t_label} of the D3fend Technique."
-            })
-
-df_compliance = pd.DataFrame(compliance_summary)
-df_reco = pd.DataFrame(recommendations)
+engine = get_engine(idx)
+df_compliance = engine.summary_frame(tool_filter)
+df_reco = get_materializer(g).recommendation_frame(tool_filter)
 
 st.subheader("🧪 Tool Compliance Overview")
 st.dataframe(df_compliance)
@@ -177,42 +161,41 @@ if not df_reco.empty:
 else:
     st.info("All tools are compliant. No recommendations to display.")
 
+perf.begin("remediation_plan")
+st.subheader("🧭 Optimized Remediation Plan")
+optimizer = get_optimizer(g, idx)
+df_plan = optimizer.plan(tool_filter, exact=st.checkbox("Exact minimum cover (small cases)"))
+if not df_plan.empty:
+    st.caption("Fewest D3FEND techniques covering each tool's missing controls, ranked by priority- and risk-weighted coverage.")
+    st.dataframe(df_plan, use_container_width=True)
+    st.download_button("📥 Download Remediation Plan", df_plan.to_csv(index=False).encode("utf-8"), "remediation_plan.csv")
+else:
+    st.info("No missing control is mitigated by a D3FEND technique.")
+
 # -------------------------
-# Risk Analysis & Heatmap
+# CSF Rollup
 # -------------------------
-risk_data = []
-compliance_rows = []
-alerts = []
-
-all_controls = list(g.subjects(RDF.type, NIST.Control))
-for tool in g.subjects(RDF.type, NIST.Tool):
-    label = next(g.objects(tool, RDFS.label), tool.split("#")[-1])
-    if tool_filter != "All" and label != tool_filter:
-        continue
-    implemented = list(g.objects(tool, NIST.implementsControl))
-    comp = len(implemented)
-    noncomp = len(set(all_controls) - set(implemented))
-    total = len(all_controls)
-    score = (comp / total * 100) if total > 0 else 0
+perf.begin("csf_rollup")
+st.subheader("🏛️ CSF Compliance Rollup (priority-weighted)")
+rollup = get_rollup(g, idx)
+st.dataframe(rollup.scores_frame("function", tool_filter).round(2), use_container_width=True)
+rollup_functions = rollup.nodes["function"]
+if rollup_functions:
+    rcol1, rcol2 = st.columns(2)
+    with rcol1:
+        drill_function = st.selectbox("Drill into Function", rollup_functions, format_func=rollup.label)
+    with rcol2:
+        drill_category = st.selectbox("Drill into Category", [None] + rollup.children.get(drill_function, []),
+                                      format_func=lambda n: "All Categories" if n is None else rollup.label(n))
+    st.dataframe(rollup.breakdown(drill_category or drill_function, tool_filter).round(2), use_container_width=True)
 
-    compliance_rows.append({"Tool": label, "Score (%)": round(score, 2), "Passed": comp, "Failed": noncomp})
-
-    for asset, _, threat in g.triples((None, NIST.isTargetedBy, None)):
-        a_label = next(g.objects(asset, RDFS.label), asset.split("#")[-1])
-        t_label = next(g.objects(threat, RDFS.label), threat.split("#")[-1])
-        sev = next(g.objects(threat, NIST.severityLevel), Literal("Unknown"))
-        lik = next(g.objects(threat, NIST.likelihood), Literal(0.0))
-        imp = next(g.objects(threat, NIST.impact), Literal(0))
-        risk = next(g.objects(threat, NIST.riskScore), Literal(0.0))
-
-        risk_data.append({"Tool": label, "Asset": a_label, "Threat": t_label, "Severity": str(sev), "Likelihood": float(lik), "Impact": int(imp), "Risk Score": float(risk)})
-
-        if float(risk) >= 5.0 and str(sev) == "High" and score < 50:
-            alerts.append({"Tool": label, "Asset": a_label, "Threat": t_label, "Severity": str(sev), "Risk Score": float(risk), "Compliance Score (%)": round(score, 2), "Alert": "⚠️ High risk threat + low compliance"})
-
-df_risk = pd.DataFrame(risk_data)
-df_compliance = pd.DataFrame(compliance_rows)
-df_alerts = pd.DataFrame(alerts)
+# -------------------------
+# Risk Analysis & Heatmap
+# -------------------------
+perf.begin("risk")
+rows = engine.tool_rows(tool_filter)
+df_risk, df_alerts = build_risk_tables(get_threat_frame(g, idx), engine.tool_labels[rows], engine.scores[rows])
+df_compliance = engine.score_frame(tool_filter)
 
 st.subheader("📊 Simulated Compliance Scoring")
 st.dataframe(df_compliance)
@@ -248,14 +231,42 @@ if not filtered_risk.empty and "Severity" in filtered_risk.columns:
 st.dataframe(filtered_risk)
 
 # Heatmap
+perf.begin("heatmap")
 st.subheader("🔥 Threat Heatmap: Tool × Asset × Risk")
 if not filtered_risk.empty and "Tool" in filtered_risk.columns and "Asset" in filtered_risk.columns:
-    heatmap_df = filtered_risk.pivot_table(index="Tool", columns="Asset", values="Risk Score", aggfunc="sum", fill_value=0)
-    fig = px.imshow(heatmap_df, labels=dict(x="Asset", y="Tool", color="Risk Score"), color_continuous_scale="Reds", aspect="auto")
-    st.plotly_chart(fig, use_container_width=True)
+    fig = artifacts.heatmap(tool_filter) if artifacts and asset_filter == severity_filter == "All" else None
+    st.plotly_chart(fig or heatmap_figure(filtered_risk), use_container_width=True)
 
 # Downloads
 st.download_button("📥 Download Risk CSV", filtered_risk.to_csv(index=False).encode("utf-8"), "risk_exposure_report.csv")
 st.download_button("📥 Download Compliance CSV", df_compliance.to_csv(index=False).encode("utf-8"), "compliance_scores.csv")
 if not df_alerts.empty:
     st.download_button("📥 Download Alert Summary", df_alerts.to_csv(index=False).encode("utf-8"), "compliance_risk_alerts.csv")
+
+# -------------------------
+# Monte Carlo Risk Simulation
+# -------------------------
+perf.begin("risk_simulation")
+st.subheader("🎲 Monte Carlo Risk Simulation")
+if st.checkbox("Run simulation", value=False):
+    scol1, scol2 = st.columns(2)
+    with scol1:
+        sim_trials = st.select_slider("Trials", options=[1000, 10000, 50000, 100000], value=10000)
+    with scol2:
+        sim_effectiveness = st.slider("Mitigation effectiveness", 0.0, 1.0, 0.8, step=0.05)
+    df_sim = get_simulator(g, idx).simulate(tool_filter, trials=sim_trials, effectiveness=sim_effectiveness)
+    if df_sim.empty:
+        st.info("No Asset is linked to a Threat through isTargetedBy or isVulnerableTo.")
+    else:
+        st.dataframe(df_sim.round(3), use_container_width=True)
+        st.bar_chart(df_sim.pivot_table(index="Asset", columns="Tool", values="VaR 95%", aggfunc="sum"))
+        st.download_button("📥 Download Simulation CSV", df_sim.to_csv(index=False).encode("utf-8"), "risk_simulation.csv")
+
+# -------------------------
+# Performance
+# -------------------------
+perf.end()
+with st.sidebar.expander("⏱️ Performance", expanded=False):
+    st.caption(f"Rerun {perf.run_id}: {perf.total_ms():.0f} ms total")
+    st.dataframe(perf.frame(), hide_index=True, use_container_width=True)
+perf.write()
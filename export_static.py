@@ -0,0 +1,383 @@
+# Pre-rendered static export of the explorer, heatmap and compliance tables
+#
+# Every artifact depends only on the ontology revision, so it is built once per
+# digest into static/<digest[:16]>/ and gzip-compressed:
+#
+#   manifest.json                 views, tools and the sha256 of every artifact
+#   explorer/<view>.json.gz       precomputed node coordinates and edges
+#   explorer/<view>.html.gz       the same view as pyvis HTML (what the dashboard embeds)
+#   heatmap/<tool>.json.gz        plotly figure of the Tool x Asset risk heatmap
+#   tables/<report>.csv.gz        compliance, recommendation, risk and alert tables
+#
+# static/index.html is a standalone viewer that reads static/LATEST, fetches the
+# manifest and lazily loads explorer views, heatmaps and tables, decompressing
+# them in the browser, with the vis-network and plotly.js bundles copied once
+# to static/lib/. The whole directory can be
+# served by any static file server (serve the .gz files as they are, without a
+# Content-Encoding header). The dashboards pick up the artifacts of their
+# snapshot digest when present and fall back to rendering live.
+#
+#   python export_static.py RiskOnto_v1.owl --out static
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from functools import lru_cache
+
+import plotly.express as px
+
+from graph_layout import OTHER, ROOT, get_layout, render_html
+
+EXPORT_VERSION = 1
+EXPORT_MAX_NODES = 300
+STATIC_DIR = os.environ.get("RISKONTO_STATIC_DIR", "static")
+VIS_LIB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib", "vis-9.1.2")
+PLOTLY_JS = os.path.join(os.path.dirname(px.__file__), "..", "package_data", "plotly.min.js")
+
+
+def view_id(node):
+    if node == ROOT:
+        return "csf"
+    if node == OTHER:
+        return "other"
+    return hashlib.sha1(str(node).encode("utf-8")).hexdigest()[:12]
+
+
+def tool_id(tool):
+    return "all" if tool == "All" else hashlib.sha1(str(tool).encode("utf-8")).hexdigest()[:12]
+
+
+def heatmap_figure(risk):
+    heatmap_df = risk.pivot_table(index="Tool", columns="Asset", values="Risk Score", aggfunc="sum", fill_value=0)
+    return px.imshow(heatmap_df, labels=dict(x="Asset", y="Tool", color="Risk Score"), color_continuous_scale="Reds", aspect="auto")
+
+
+# -------------------------
+# Build
+# -------------------------
+class _Writer:
+    def __init__(self, root):
+        self.root = root
+        self.artifacts = {}
+
+    def write(self, name, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        packed = gzip.compress(data, compresslevel=9, mtime=0)  # byte-identical across rebuilds
+        path = os.path.join(self.root, name + ".gz")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(packed)
+        self.artifacts[name + ".gz"] = {
+            "sha256": hashlib.sha256(packed).hexdigest(), "bytes": len(packed), "raw_bytes": len(data),
+        }
+
+
+def _views(layout):
+    # Root, every Function and every Category, in explorer order
+    views, seen = [(ROOT, None, 0)], {ROOT}
+    for function in layout.functions():
+        views.append((function, ROOT, 1))
+        seen.add(function)
+        for category in layout.categories(function):
+            if category not in seen:
+                views.append((category, function, 2))
+                seen.add(category)
+    return views
+
+
+def build(path="RiskOnto_v1.owl", out=STATIC_DIR, format="xml", max_nodes=EXPORT_MAX_NODES, force=False):
+    """Export the artifacts of ``path``'s current revision; return its version directory."""
+    from compliance import get_engine
+    from ontology_index import get_index
+    from ontology_loader import file_digest, load_ontology
+    from reports import build_reports
+    from rollups import get_rollup
+
+    digest = file_digest(path)
+    target = os.path.join(out, digest[:16])
+    if os.path.exists(os.path.join(target, "manifest.json")) and not force:
+        _publish(out, digest[:16])
+        return target
+
+    g = load_ontology(path, format=format)
+    idx = get_index(g)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    writer = _Writer(tmp)
+
+    layout = get_layout(idx)
+    views = []
+    for node, parent, depth in _views(layout):
+        nodes, edges, hidden = layout.view(node, max_nodes)
+        vid = view_id(node)
+        writer.write(f"explorer/{vid}.json", json.dumps({"nodes": nodes, "edges": edges, "hidden": hidden}))
+        writer.write(f"explorer/{vid}.html", render_html(nodes, edges))
+        views.append({"id": vid, "label": layout.labels[node], "kind": layout.kinds[node],
+                      "parent": None if parent is None else view_id(parent), "depth": depth,
+                      "nodes": len(nodes), "hidden": hidden})
+
+    engine = get_engine(idx)
+    reports = build_reports(g)
+    reports["compliance_summary"] = engine.summary_frame()
+    reports["csf_rollup"] = get_rollup(g, idx).scores_frame("function").reset_index()
+    for name, df in reports.items():
+        writer.write(f"tables/{name}.csv", df.to_csv(index=False))
+
+    risk = reports["risk_exposure_report"]
+    tools = ["All"] + sorted(str(t) for t in engine.tool_labels)
+    for tool in tools:
+        subset = risk if tool == "All" else risk[risk["Tool"] == tool]
+        if not subset.empty:
+            writer.write(f"heatmap/{tool_id(tool)}.json", heatmap_figure(subset).to_json())
+
+    manifest = {
+        "version": EXPORT_VERSION,
+        "digest": digest,
+        "source": os.path.basename(path),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "max_nodes": max_nodes,
+        "views": views,
+        "tools": {tool: tool_id(tool) for tool in tools},
+        "artifacts": writer.artifacts,
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+
+    if os.path.isdir(VIS_LIB):
+        shutil.copytree(VIS_LIB, os.path.join(out, "lib", "vis-9.1.2"), dirs_exist_ok=True)
+    if os.path.isfile(PLOTLY_JS):
+        os.makedirs(os.path.join(out, "lib", "plotly"), exist_ok=True)
+        shutil.copyfile(PLOTLY_JS, os.path.join(out, "lib", "plotly", "plotly.min.js"))
+    with open(os.path.join(out, "index.html"), "w", encoding="utf-8") as f:
+        f.write(VIEWER_HTML)
+    _publish(out, digest[:16])
+    return target
+
+
+def _publish(out, version):
+    tmp = os.path.join(out, f"LATEST.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(tmp, os.path.join(out, "LATEST"))
+
+
+VIEWER_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>RiskOnto Graph Explorer</title>
+<link rel="stylesheet" href="lib/vis-9.1.2/vis-network.css">
+<script src="lib/vis-9.1.2/vis-network.min.js"></script>
+<style>
+  body { margin: 0; background: #111111; color: white; font-family: sans-serif; }
+  #bar { padding: 8px; }
+  .pane { height: calc(100vh - 48px); overflow: auto; }
+  table { border-collapse: collapse; font-size: 13px; }
+  th, td { border: 1px solid #444444; padding: 2px 6px; text-align: left; }
+  a { color: #88bbff; }
+</style>
+</head>
+<body>
+<div id="bar">
+  <select id="mode"><option value="explorer">Explorer</option><option value="heatmap">Heatmap</option><option value="tables">Tables</option></select>
+  <select id="view"></select> <span id="info"></span>
+</div>
+<div id="explorer" class="pane"></div>
+<div id="heatmap" class="pane" hidden></div>
+<div id="tables" class="pane" hidden></div>
+<script>
+const TABLE_ROWS = 1000;
+
+async function gunzipText(url) {
+  const response = await fetch(url);
+  return await new Response(response.body.pipeThrough(new DecompressionStream("gzip"))).text();
+}
+
+function parseCSV(text) {
+  const rows = [];
+  let row = [], field = "", quoted = false;
+  for (let i = 0; i < text.length; i++) {
+    const c = text[i];
+    if (quoted) {
+      if (c !== '"') field += c;
+      else if (text[i + 1] === '"') { field += '"'; i++; }
+      else quoted = false;
+    } else if (c === '"') quoted = true;
+    else if (c === ",") { row.push(field); field = ""; }
+    else if (c === "\\n") { row.push(field); rows.push(row); row = []; field = ""; }
+    else if (c !== "\\r") field += c;
+  }
+  if (field || row.length) { row.push(field); rows.push(row); }
+  return rows;
+}
+
+function loadScript(src) {
+  return new Promise((resolve, reject) => {
+    const script = document.createElement("script");
+    script.src = src;
+    script.onload = resolve;
+    script.onerror = reject;
+    document.head.appendChild(script);
+  });
+}
+
+(async () => {
+  const version = (await (await fetch("LATEST")).text()).trim();
+  const manifest = await (await fetch(`${version}/manifest.json`)).json();
+  const mode = document.getElementById("mode");
+  const select = document.getElementById("view");
+  const info = document.getElementById("info");
+  const tables = Object.keys(manifest.artifacts)
+    .filter(name => name.startsWith("tables/"))
+    .map(name => name.slice("tables/".length, -".csv.gz".length));
+  let network = null, plotly = null;
+
+  const modes = {
+    explorer: {
+      options: () => manifest.views.map(v => ["\\u00a0\\u00a0".repeat(v.depth) + v.label, v.id]),
+      async show(id) {
+        network = network || new vis.Network(document.getElementById("explorer"), {}, {physics: false});
+        const view = JSON.parse(await gunzipText(`${version}/explorer/${id}.json.gz`));
+        network.setData({
+          nodes: new vis.DataSet(view.nodes),
+          edges: new vis.DataSet(view.edges.map(([from, to]) => ({from, to}))),
+        });
+        info.textContent = view.hidden ? `${view.hidden} more nodes hidden by the node cap` : "";
+      },
+    },
+    heatmap: {
+      options: () => Object.entries(manifest.tools)
+        .filter(([, id]) => `heatmap/${id}.json.gz` in manifest.artifacts),
+      async show(id) {
+        plotly = plotly || loadScript("lib/plotly/plotly.min.js");  // only fetched when needed
+        await plotly;
+        const figure = JSON.parse(await gunzipText(`${version}/heatmap/${id}.json.gz`));
+        Plotly.react("heatmap", figure.data, figure.layout);
+        info.textContent = "";
+      },
+    },
+    tables: {
+      options: () => tables.map(name => [name, name]),
+      async show(name) {
+        const url = `${version}/tables/${name}.csv.gz`;
+        const [header, ...rows] = parseCSV(await gunzipText(url)).filter(r => r.length > 1 || r[0]);
+        const table = document.createElement("table");
+        for (const [cells, tag] of [[header || [], "th"], ...rows.slice(0, TABLE_ROWS).map(r => [r, "td"])]) {
+          const tr = table.insertRow();
+          for (const cell of cells) {
+            const td = document.createElement(tag);
+            td.textContent = cell;
+            tr.appendChild(td);
+          }
+        }
+        document.getElementById("tables").replaceChildren(table);
+        info.replaceChildren(`${rows.length} rows${rows.length > TABLE_ROWS ? `, first ${TABLE_ROWS} shown` : ""} `);
+        const link = document.createElement("a");
+        link.href = url;
+        link.download = `${name}.csv.gz`;
+        link.textContent = "download";
+        info.appendChild(link);
+      },
+    },
+  };
+
+  function switchMode() {
+    for (const name of Object.keys(modes)) document.getElementById(name).hidden = name !== mode.value;
+    select.replaceChildren(...modes[mode.value].options().map(([label, value]) => new Option(label, value)));
+    if (select.options.length) modes[mode.value].show(select.value);
+    else info.textContent = "nothing exported";
+  }
+  mode.onchange = switchMode;
+  select.onchange = () => modes[mode.value].show(select.value);
+  switchMode();
+})();
+</script>
+</body>
+</html>
+"""
+
+
+# -------------------------
+# Lazy loading
+# -------------------------
+class StaticArtifacts:
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.max_nodes = self.manifest["max_nodes"]
+        self.views = {v["id"]: v for v in self.manifest["views"]}
+        self.read = lru_cache(maxsize=256)(self._read)
+
+    def _read(self, name):
+        """Decompressed bytes of artifact ``name``; None when it was not exported."""
+        if name + ".gz" not in self.manifest["artifacts"]:
+            return None
+        with gzip.open(os.path.join(self.directory, name + ".gz"), "rb") as f:
+            return f.read()
+
+    def explorer_html(self, focus):
+        """(html, shown, hidden) like ExplorerLayout.html() for the export's node cap, or None."""
+        view = self.views.get(view_id(focus))
+        html = self.read(f"explorer/{view_id(focus)}.html") if view else None
+        if html is None:
+            return None
+        return html.decode("utf-8"), view["nodes"], view["hidden"]
+
+    def heatmap(self, tool="All"):
+        """Plotly figure spec (a dict st.plotly_chart accepts), or None."""
+        tid = self.manifest["tools"].get(tool)
+        data = self.read(f"heatmap/{tid}.json") if tid else None
+        return json.loads(data) if data is not None else None
+
+
+_lock = threading.Lock()
+_artifacts = {}
+
+
+def get_artifacts(digest, root=STATIC_DIR):
+    # None until an export of this revision exists; checked again on every call
+    directory = os.path.join(root, digest[:16])
+    artifacts = _artifacts.get(directory)
+    if artifacts is None:
+        if not os.path.exists(os.path.join(directory, "manifest.json")):
+            return None
+        with _lock:
+            artifacts = _artifacts.get(directory)
+            if artifacts is None:
+                artifacts = StaticArtifacts(directory)
+                if artifacts.manifest.get("version") != EXPORT_VERSION or artifacts.manifest.get("digest") != digest:
+                    return None
+                _artifacts[directory] = artifacts
+    return artifacts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-render the explorer, heatmap and tables as static artifacts.")
+    parser.add_argument("ontology", nargs="?", default="RiskOnto_v1.owl")
+    parser.add_argument("--out", default=STATIC_DIR)
+    parser.add_argument("--format", default="xml")
+    parser.add_argument("--max-nodes", type=int, default=EXPORT_MAX_NODES)
+    parser.add_argument("--force", action="store_true", help="rebuild even if this revision was exported")
+    args = parser.parse_args(argv)
+
+    target = build(args.ontology, args.out, args.format, args.max_nodes, args.force)
+    with open(os.path.join(target, "manifest.json"), encoding="utf-8") as f:
+        artifacts = json.load(f)["artifacts"]
+    total = sum(a["bytes"] for a in artifacts.values())
+    raw = sum(a["raw_bytes"] for a in artifacts.values())
+    print(f"{target}: {len(artifacts)} artifacts, {total / 1024:.0f} KiB ({raw / 1024:.0f} KiB uncompressed)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+# Level-of-detail layout for the Graph Explorer
+#
+# Rather than pushing every SubCategory -> Control -> Technique node into the
+# browser and letting vis.js run physics, the explorer shows one slice of the
+# CSF tree at a time: the Functions, one Function's Categories, or one
+# Category's SubCategories with their Controls and D3FEND Techniques. Node
+# positions are computed here with a deterministic radial tree layout, so the
+# browser renders a static picture that looks the same on every reload.
+import math
+import threading
+from collections import OrderedDict
+
+from pyvis.network import Network
+
+from ontology_index import NIST, clean_label, get_csf_aliases, is_valid_uri, per_index_cache
+
+ROOT = "csf"
+OTHER = "csf:other"
+RING_SPACING = 220
+MAX_CACHED_VIEWS = 64
+
+STYLES = {
+    "root": ("#7f7f7f", "dot"),
+    "function": ("#9467bd", "star"),
+    "category": ("#d62728", "triangle"),
+    "subcategory": ("#1f77b4", "box"),
+    "control": ("#ff7f0e", "ellipse"),
+    "technique": ("#2ca02c", "diamond"),
+}
+
+# How many levels below the focus node each kind of view expands
+VIEW_DEPTH = {"root": 2, "function": 2, "category": 3}
+
+
+class ExplorerLayout:
+    def __init__(self, idx):
+        self.labels = {ROOT: "NIST CSF 2.0", OTHER: "Unassigned"}
+        self.kinds = {ROOT: "root", OTHER: "function"}
+        self.children = {}
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Functions and SubCategories are merged over their aliases, so the
+        # Categories hang off the typed Function and the Controls off the
+        # SubCategory that carries belongsToCategory
+        aliases = get_csf_aliases(idx)
+        canonical = aliases.canonical
+
+        def add(parent, child, kind):
+            if child not in self.kinds:
+                self.kinds[child] = kind
+                self.labels[child] = aliases.labels.get(child) or clean_label(idx.label(child))
+            siblings = self.children.setdefault(parent, [])
+            if child not in siblings:
+                siblings.append(child)
+
+        categories = [c for c in idx.of_type(NIST.Category) if is_valid_uri(c)]
+        category_set = set(categories)
+
+        for group in aliases.functions.values():
+            function = group[0]
+            add(ROOT, function, "function")
+            for alias in group:
+                linked = idx.objects(alias, NIST.hasCategory) + idx.subjects(NIST.belongsToFunction, alias)
+                for category in linked:
+                    if category in category_set:
+                        add(function, category, "category")
+        for category in categories:
+            if category not in self.kinds:
+                add(OTHER, category, "category")
+            for subcat in idx.subjects(NIST.belongsToCategory, category):
+                if subcat in canonical:
+                    add(category, canonical[subcat], "subcategory")
+        for group in aliases.subcategories.values():
+            subcat = group[0]
+            if subcat not in self.kinds:
+                add(OTHER, subcat, "subcategory")
+            for alias in group:
+                for control in idx.objects(alias, NIST.hasControl):
+                    if not is_valid_uri(control):
+                        continue
+                    add(subcat, control, "control")
+                    for tech in idx.objects(control, NIST.hasMitigation):
+                        if is_valid_uri(tech):
+                            add(control, tech, "technique")
+        if OTHER in self.children:
+            add(ROOT, OTHER, "function")
+
+    def functions(self):
+        return list(self.children.get(ROOT, []))
+
+    def categories(self, function):
+        return [c for c in self.children.get(function, []) if self.kinds[c] == "category"]
+
+    def view(self, focus=ROOT, max_nodes=300):
+        """Return (nodes, edges, hidden) for the slice of the tree under ``focus``.
+
+        Nodes are visited breadth-first and the view stops growing at
+        ``max_nodes``; ``hidden`` counts the reachable nodes that were cut.
+        """
+        depth = VIEW_DEPTH.get(self.kinds[focus], 1)
+        order, parent, level = [focus], {focus: None}, {focus: 0}
+        hidden = 0
+        for node in order:
+            if level[node] == depth:
+                continue
+            for child in self.children.get(node, []):
+                if child in parent:
+                    continue
+                if len(order) >= max_nodes:
+                    hidden += 1
+                    continue
+                parent[child] = node
+                level[child] = level[node] + 1
+                order.append(child)
+
+        # Radial tree: every node gets an angular sector proportional to the
+        # number of leaves below it and sits on the ring of its depth.
+        kids = {n: [] for n in order}
+        for n in order[1:]:
+            kids[parent[n]].append(n)
+        weight = {}
+        for n in reversed(order):
+            weight[n] = sum(weight[c] for c in kids[n]) or 1
+        sector = {focus: (0.0, 2 * math.pi)}
+        positions = {focus: (0.0, 0.0)}
+        for n in order:
+            start, end = sector[n]
+            for c in kids[n]:
+                span = (end - start) * weight[c] / weight[n]
+                sector[c] = (start, start + span)
+                angle = start + span / 2
+                radius = level[c] * RING_SPACING
+                positions[c] = (radius * math.cos(angle), radius * math.sin(angle))
+                start += span
+
+        nodes = []
+        for n in order:
+            color, shape = STYLES[self.kinds[n]]
+            x, y = positions[n]
+            nodes.append({"id": str(n), "label": self.labels[n], "kind": self.kinds[n],
+                          "color": color, "shape": shape, "x": round(x, 1), "y": round(y, 1)})
+        # Tree edges plus links to nodes already placed under another parent
+        edges = [(str(n), str(c)) for n in order for c in self.children.get(n, []) if c in parent and c != focus]
+        return nodes, edges, hidden
+
+    def html(self, focus=ROOT, max_nodes=300):
+        key = (focus, max_nodes)
+        with self._lock:
+            if key in self._views:
+                self._views.move_to_end(key)
+                return self._views[key]
+        nodes, edges, hidden = self.view(focus, max_nodes)
+        html = render_html(nodes, edges)
+        with self._lock:
+            self._views[key] = (html, len(nodes), hidden)
+            while len(self._views) > MAX_CACHED_VIEWS:
+                self._views.popitem(last=False)
+        return html, len(nodes), hidden
+
+
+def render_html(nodes, edges, height="700px"):
+    net = Network(height=height, width="100%", bgcolor="#111111", font_color="white")
+    net.toggle_physics(False)
+    for n in nodes:
+        net.add_node(n["id"], label=n["label"], color=n["color"], shape=n["shape"],
+                     x=n["x"], y=n["y"], physics=False)
+    for source, target in edges:
+        net.add_edge(source, target)
+    return net.generate_html()
+
+
+@per_index_cache
+def get_layout(idx):
+    return ExplorerLayout(idx)
@@ -0,0 +1,248 @@
+# Forward-chaining materialization of the compliance properties
+#
+# RiskOnto declares ont:nonCompliantWith and ont:recommendedMitigation but the
+# shipped SWRL rule is empty, so the dashboard used to derive both on the fly.
+# ComplianceMaterializer writes them as triples instead:
+#
+#   Tool(t), Control(c), not implementsControl(t, c)  ->  nonCompliantWith(t, c)
+#   nonCompliantWith(t, c), hasMitigation(c, m)        ->  recommendedMitigation(t, m)
+#
+# The object is the Control (what the dashboard reports as "Non-Compliant
+# With"), not the SubCategory range stated in the OWL. For every tool it keeps
+# how many missing controls support each recommended technique, so gaining or
+# losing one implementsControl edge only touches that tool's derived triples.
+# The dashboard's "Smart Recommendations" and reports.py come from
+# recommendation_frame(), built from the same state and memoized per filter.
+#
+#   python inference.py RiskOnto_v1.owl --out inferred.nt
+import argparse
+import sys
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from rdflib import Graph, Namespace
+
+from ontology_index import NIST, get_index, per_index_cache
+
+ONT = Namespace("http://www.co-ode.org/ontologies/ont.owl#")
+
+
+class ComplianceMaterializer:
+    def __init__(self, g, target=None, idx=None):
+        """Derive the compliance triples of ``g`` into ``target`` (a new Graph by default).
+
+        Passing ``target=g`` writes them into the ontology itself.
+        """
+        self.g = g
+        self.target = Graph() if target is None else target
+        self.target.bind("ont", ONT)
+        idx = idx or get_index(g)
+        self.controls = list(dict.fromkeys(idx.of_type(NIST.Control)))
+        self.control_set = set(self.controls)
+        self.mitigations = {c: list(dict.fromkeys(idx.objects(c, NIST.hasMitigation))) for c in self.controls}
+        self.implemented = {}
+        self.support = {}
+        self._frames = {}  # tool_filter -> recommendation frame, until the next change
+        self.add_tools(idx.of_type(NIST.Tool), idx)
+
+    # -------------------------
+    # Bulk derivation
+    # -------------------------
+    def add_tools(self, tools, idx=None):
+        self._frames.clear()
+        quads = []
+        for tool in tools:
+            if tool in self.implemented:
+                continue
+            objects = idx.objects(tool, NIST.implementsControl) if idx else self.g.objects(tool, NIST.implementsControl)
+            implemented = {c for c in objects if c in self.control_set}
+            support = Counter()
+            for c in self.controls:
+                if c in implemented:
+                    continue
+                quads.append((tool, ONT.nonCompliantWith, c, self.target))
+                support.update(self.mitigations[c])
+            quads.extend((tool, ONT.recommendedMitigation, m, self.target) for m in support)
+            self.implemented[tool] = implemented
+            self.support[tool] = support
+        self.target.addN(quads)
+
+    def remove_tool(self, tool):
+        self._frames.clear()
+        if self.implemented.pop(tool, None) is None:
+            return
+        self.support.pop(tool, None)
+        self.target.remove((tool, ONT.nonCompliantWith, None))
+        self.target.remove((tool, ONT.recommendedMitigation, None))
+
+    # -------------------------
+    # Incremental maintenance
+    # -------------------------
+    def _gap_closed(self, tool, control):
+        self._frames.clear()
+        self.target.remove((tool, ONT.nonCompliantWith, control))
+        support = self.support[tool]
+        for m in self.mitigations[control]:
+            support[m] -= 1
+            if support[m] <= 0:
+                del support[m]
+                self.target.remove((tool, ONT.recommendedMitigation, m))
+
+    def _gap_opened(self, tool, control):
+        self._frames.clear()
+        self.target.add((tool, ONT.nonCompliantWith, control))
+        support = self.support[tool]
+        for m in self.mitigations[control]:
+            if not support[m]:
+                self.target.add((tool, ONT.recommendedMitigation, m))
+            support[m] += 1
+
+    def control_added(self, tool, control):
+        """Update ``tool``'s derived triples after it gained implementsControl ``control``."""
+        if tool not in self.implemented:
+            self.add_tools([tool])
+            return
+        implemented = self.implemented[tool]
+        if control not in self.control_set or control in implemented:
+            return
+        implemented.add(control)
+        self._gap_closed(tool, control)
+
+    def control_removed(self, tool, control):
+        """Update ``tool``'s derived triples after it lost implementsControl ``control``."""
+        implemented = self.implemented.get(tool)
+        if implemented is None or control not in implemented:
+            return
+        implemented.discard(control)
+        self._gap_opened(tool, control)
+
+    def control_declared(self, control, mitigations=()):
+        """Start deriving for a new Control; every tool not implementing it becomes non-compliant."""
+        if control in self.control_set:
+            return
+        self._frames.clear()
+        self.controls.append(control)
+        self.control_set.add(control)
+        self.mitigations[control] = list(dict.fromkeys(mitigations))
+        for tool, implemented in self.implemented.items():
+            if (tool, NIST.implementsControl, control) in self.g:
+                implemented.add(control)
+            else:
+                self._gap_opened(tool, control)
+
+    def control_retracted(self, control):
+        if control not in self.control_set:
+            return
+        self._frames.clear()
+        for tool, implemented in self.implemented.items():
+            if control in implemented:
+                implemented.discard(control)
+            else:
+                self._gap_closed(tool, control)
+        self.controls.remove(control)
+        self.control_set.discard(control)
+        del self.mitigations[control]
+
+    def mitigation_added(self, control, technique):
+        """Update every tool lacking ``control`` after it gained hasMitigation ``technique``."""
+        if control not in self.control_set or technique in self.mitigations[control]:
+            return
+        self._frames.clear()
+        self.mitigations[control].append(technique)
+        for tool, implemented in self.implemented.items():
+            if control not in implemented:
+                support = self.support[tool]
+                if not support[technique]:
+                    self.target.add((tool, ONT.recommendedMitigation, technique))
+                support[technique] += 1
+
+    def mitigation_removed(self, control, technique):
+        if control not in self.control_set or technique not in self.mitigations[control]:
+            return
+        self._frames.clear()
+        self.mitigations[control].remove(technique)
+        for tool, implemented in self.implemented.items():
+            if control not in implemented:
+                support = self.support[tool]
+                support[technique] -= 1
+                if support[technique] <= 0:
+                    del support[technique]
+                    self.target.remove((tool, ONT.recommendedMitigation, technique))
+
+    def implement(self, tool, control):
+        # Assert the edge in the ontology and maintain the derived triples
+        self.g.add((tool, NIST.implementsControl, control))
+        self.control_added(tool, control)
+
+    def revoke(self, tool, control):
+        self.g.remove((tool, NIST.implementsControl, control))
+        self.control_removed(tool, control)
+
+    # -------------------------
+    # Lookups
+    # -------------------------
+    def non_compliant(self, tool):
+        return list(self.target.objects(tool, ONT.nonCompliantWith))
+
+    def recommended(self, tool):
+        return list(self.target.objects(tool, ONT.recommendedMitigation))
+
+    def recommendation_frame(self, tool_filter="All"):
+        """Rows of "Smart Recommendations": each non-compliant control x a technique mitigating it.
+
+        Built from the derived state and memoized per filter until the next
+        change; the frame is shared between callers and must not be modified.
+        """
+        df = self._frames.get(tool_filter)
+        if df is None:
+            df = self._frames[tool_filter] = self._recommendation_frame(tool_filter)
+        return df
+
+    def _recommendation_frame(self, tool_filter):
+        idx = get_index(self.g)
+        tools = [t for t in self.implemented if tool_filter == "All" or str(idx.label(t)) == tool_filter]
+        control_pos = {c: j for j, c in enumerate(self.controls)}
+        # (control, technique) pairs in control order; a tool gets the pairs of its gaps
+        pairs = [(j, m) for j, c in enumerate(self.controls) for m in self.mitigations[c]]
+        pair_control = np.array([j for j, _ in pairs], dtype=np.intp)
+        missing = np.ones((len(tools), len(self.controls)), dtype=bool)
+        for i, tool in enumerate(tools):
+            missing[i, [control_pos[c] for c in self.implemented[tool]]] = False
+        tool_i, pair_k = np.nonzero(missing[:, pair_control])
+        tool_labels = np.array([str(idx.label(t)) for t in tools], dtype=object)
+        control_labels = np.array([str(idx.label(c)) for c in self.controls], dtype=object)
+        technique_labels = np.array([str(idx.label(m)) for _, m in pairs], dtype=object)
+        df = pd.DataFrame({
+            "Tool": tool_labels[tool_i],
+            "Missing Control": control_labels[pair_control[pair_k]],
+            "Suggested Technique": technique_labels[pair_k],
+        }, columns=["Tool", "Missing Control", "Suggested Technique"])
+        df["Explanation"] = (
+            df["Tool"] + " lacks NIST control " + df["Missing Control"]
+            + ", which is mitigated by " + df["Suggested Technique"] + " of the D3fend Technique."
+        )
+        return df
+
+
+@per_index_cache
+def get_materializer(g):
+    return ComplianceMaterializer(g)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Materialize nonCompliantWith / recommendedMitigation triples.")
+    parser.add_argument("ontology", nargs="?", default="RiskOnto_v1.owl")
+    parser.add_argument("--out", default="inferred.nt", help="N-Triples file for the derived triples")
+    args = parser.parse_args(argv)
+
+    from ontology_loader import load_ontology
+
+    materializer = ComplianceMaterializer(load_ontology(args.ontology))
+    materializer.target.serialize(args.out, format="nt")
+    print(f"{len(materializer.implemented)} tools, {len(materializer.target)} derived triples", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
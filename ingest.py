@@ -0,0 +1,422 @@
+# Streaming bulk importer for the NIST / D3FEND source catalogs
+#
+# Reads the CSF 2.0 workbook, the CPRT SP 800-53A workbook, the SP 800-53 to
+# D3FEND CSV and the SPARQL result export (sp_800.json) row by row and emits
+# Function, Category, SubCategory, Control and D3FEND technique triples
+# (hasCategory, belongsToFunction, belongsToCategory, hasControl,
+# hasMitigation) as N-Triples and/or straight into an OWL file.
+#
+# With --state, a digest of every source row is remembered together with the
+# triples it produced, so a re-run only emits triples for new or changed rows
+# and retracts the ones whose rows changed or disappeared.
+#
+#   python ingest.py --nt catalog.nt
+#   python ingest.py --state .riskonto_ingest.json --owl RiskOnto_v1.owl
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+
+from rdflib import Graph, Literal, RDF, RDFS, SKOS, URIRef
+
+from ontology_index import D3F, NIST, get_csf_aliases, get_index, is_valid_uri, technique_key
+
+DEFAULT_SOURCES = {
+    "csf": "csf2.xlsx",
+    "sp800_53a": "cprt_SP_800_53_A_5_1_1_07-28-2025.xlsx",
+    "d3fend_csv": "SP800-53_to_D3FEND_Mappings.csv",
+    "d3fend_json": "sp_800.json",
+}
+
+FUNCTION_RE = re.compile(r"^\s*([A-Z]+)\s*\(([A-Z]{2})\)\s*:\s*(.*)", re.S)
+CATEGORY_RE = re.compile(r"^\s*(.+?)\s*\(([A-Z]{2}\.[A-Z]{2})\)\s*:\s*(.*)", re.S)
+SUBCATEGORY_RE = re.compile(r"^\s*([A-Z]{2}\.[A-Z]{2}-\d+)\s*:\s*(.*)", re.S)
+SP800_53_REF_RE = re.compile(r"SP 800-53 Rev 5\.1\.1:\s*([A-Z]{2}-\d+(?:\(\d+\))?)")
+CONTROL_ID_RE = re.compile(r"^([A-Z]{2})-(\d+)(?:\((\d+)\))?$")
+
+
+# -------------------------
+# Naming
+# -------------------------
+def control_label(identifier):
+    # "AC-02(01)" -> "AC-2(1)"
+    m = CONTROL_ID_RE.match(identifier.strip())
+    if not m:
+        return None
+    family, number, enhancement = m.groups()
+    label = f"{family}-{int(number)}"
+    return f"{label}({int(enhancement)})" if enhancement else label
+
+
+def control_uri(label):
+    return NIST[re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")]
+
+
+def technique_uri(label):
+    return D3F[re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")]
+
+
+def _camel(text):
+    return "".join(w[:1].upper() + w[1:] for w in re.split(r"[^A-Za-z0-9]+", text) if w)
+
+
+def _category_key(label):
+    # "Data Security" and "Category_DataSecurity" -> "datasecurity"
+    return re.sub(r"^category", "", re.sub(r"[^a-z0-9]", "", str(label).lower()))
+
+
+class Namer:
+    """URIs for the imported individuals, reusing those the target ontology already has.
+
+    Controls are matched by their normalized label (AC-4(27)), SubCategories by
+    CSF id, Functions and Categories by label and techniques by technique_key,
+    so importing into RiskOnto_v1.owl attaches to its existing individuals
+    instead of minting duplicates next to them.
+    """
+
+    def __init__(self, g=None):
+        self.controls, self.subcategories, self.functions, self.categories, self.techniques = {}, {}, {}, {}, {}
+        if g is None:
+            return
+        idx = get_index(g)
+        aliases = get_csf_aliases(idx)
+        for c in idx.of_type(NIST.Control):
+            # Label first ("AC-4(27)"), then a minted local name ("AC_4_27")
+            local = re.sub(r"^([A-Z]{2})_(\d+)_(\d+)$", r"\1-\2(\3)", c.split("#")[-1]).replace("_", "-")
+            key = control_label(str(idx.label(c))) or control_label(local)
+            if key and is_valid_uri(c):
+                self.controls.setdefault(key, c)
+        for key, group in aliases.subcategories.items():
+            if not isinstance(key, URIRef):
+                self.subcategories.setdefault(key, group[0])
+        for key, group in aliases.functions.items():
+            self.functions.setdefault(key.lower(), group[0])
+        for c in idx.of_type(NIST.Category):
+            self.categories.setdefault(_category_key(idx.label(c)), c)
+        for t in list(idx.of_type(NIST.D3FENDTechnique)) + [t for _, t in idx.pairs(NIST.hasMitigation)]:
+            if is_valid_uri(t):
+                self.techniques.setdefault(technique_key(str(idx.label(t))), t)
+
+    def control(self, label):
+        return self.controls.get(label) or control_uri(label)
+
+    def technique(self, label):
+        return self.techniques.get(technique_key(label)) or technique_uri(label)
+
+    def subcategory(self, code):
+        return self.subcategories.get(code) or NIST["Subcategory_" + re.sub(r"[.\-]", "_", code)]
+
+    def function(self, name):
+        return self.functions.get(name.lower()) or NIST[f"Function_{name.title()}"]
+
+    def category(self, name):
+        return self.categories.get(_category_key(name)) or NIST[f"Category_{_camel(name)}"]
+
+
+# -------------------------
+# Row sources: each yields (key, values, triples) with triples built lazily
+# -------------------------
+def csf_rows(path, namer):
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb["CSF 2.0"] if "CSF 2.0" in wb.sheetnames else wb.worksheets[-1]
+        function = category = None
+        for row in ws.iter_rows(values_only=True):
+            cells = [c if isinstance(c, str) else "" for c in (tuple(row) + ("",) * 5)[:5]]
+            func_cell, cat_cell, sub_cell, _, refs = cells
+            if func_cell and (m := FUNCTION_RE.match(func_cell)):
+                name, code, text = m.groups()
+                function = namer.function(name)
+                values = (name, code, text)
+                yield f"csf:{code}", values, lambda f=function, n=name, t=text: [
+                    (f, RDF.type, NIST.Function),
+                    (f, RDFS.label, Literal(n.title())),
+                    (f, NIST.description, Literal(t.strip())),
+                ]
+            elif cat_cell and (m := CATEGORY_RE.match(cat_cell)):
+                name, code, text = m.groups()
+                category = namer.category(name)
+                values = (str(function), name, code, text)
+                yield f"csf:{code}", values, lambda c=category, f=function, n=name, t=text: [
+                    (c, RDF.type, NIST.Category),
+                    (c, RDFS.label, Literal(n)),
+                    (c, NIST.description, Literal(t.strip())),
+                ] + ([(f, NIST.hasCategory, c), (c, NIST.belongsToFunction, f)] if f is not None else [])
+            elif sub_cell and (m := SUBCATEGORY_RE.match(sub_cell)):
+                code, text = m.groups()
+                subcat = namer.subcategory(code)
+                controls = [control_label(c) for c in SP800_53_REF_RE.findall(refs)]
+                values = (str(function), str(category), code, text, refs)
+
+                def triples(s=subcat, c=category, f=function, code=code, text=text, controls=controls):
+                    out = [
+                        (s, RDF.type, NIST.SubCategory),
+                        (s, RDFS.label, Literal(code)),
+                        (s, NIST.subcategoryID, Literal(code)),
+                        (s, NIST.description, Literal(text.strip())),
+                    ]
+                    if c is not None:
+                        out.append((s, NIST.belongsToCategory, c))
+                    if f is not None:
+                        out.append((s, NIST.belongsToFunction, f))
+                    out.extend((s, NIST.hasControl, namer.control(label)) for label in dict.fromkeys(controls) if label)
+                    return out
+                yield f"csf:{code}", values, triples
+    finally:
+        wb.close()
+
+
+def sp800_53a_rows(path, namer):
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(h or "").strip().lower() for h in next(rows, ())]
+        col = {name: i for i, name in enumerate(header)}
+        for row in rows:
+            identifier = str(row[col["identifier"]] or "")
+            label = control_label(identifier)
+            if label is None:
+                continue  # assessment objectives, ODPs and methods
+            family = str(row[col["family"]] or "").strip()
+            name = str(row[col["control-name"]] or "").strip()
+            values = (identifier, family, name)
+            yield f"sp800-53a:{label}", values, lambda c=namer.control(label), lab=label, n=name: [
+                (c, RDF.type, NIST.Control),
+                (c, RDFS.label, Literal(lab)),
+            ] + ([(c, NIST.description, Literal(n.title()))] if n else [])
+    finally:
+        wb.close()
+
+
+def mapping_triples(namer, label, technique, relation=None, technique_ref=None):
+    c, t = namer.control(label), namer.technique(technique)
+    out = [
+        (c, RDF.type, NIST.Control),
+        (c, RDFS.label, Literal(label)),
+        (c, NIST.hasMitigation, t),
+        (t, RDF.type, NIST.D3FENDTechnique),
+        (t, RDFS.label, Literal(technique)),
+    ]
+    if relation:
+        out.append((c, SKOS.note, Literal(relation)))
+    if technique_ref:
+        out.append((t, RDFS.seeAlso, URIRef(technique_ref)))
+    return out
+
+
+def d3fend_csv_rows(path, namer):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            label = control_label(row.get("SP 800-53 Control", ""))
+            technique = (row.get("D3FEND Technique") or "").strip()
+            if label is None or not technique:
+                continue
+            yield f"d3fend-csv:{label}|{technique}", (label, technique), lambda lab=label, t=technique: mapping_triples(namer, lab, t)
+
+
+def iter_json_array(path, key, chunk_size=1 << 16):
+    # Incrementally decode the objects of the first JSON array stored under
+    # ``key`` without loading the whole document.
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buf, pos, started = "", 0, False
+        while True:
+            chunk = f.read(chunk_size)
+            buf = buf[pos:] + chunk
+            pos = 0
+            if not started:
+                at = buf.find(f'"{key}"')
+                bracket = buf.find("[", at) if at >= 0 else -1
+                if bracket < 0:
+                    if not chunk:
+                        return
+                    pos = max(0, len(buf) - len(key) - 64)
+                    continue
+                pos, started = bracket + 1, True
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf) and buf[pos] == "]":
+                    return
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        return
+                    break
+                yield item
+                pos = end
+            if not chunk:
+                return
+
+
+def d3fend_json_rows(path, namer):
+    for binding in iter_json_array(path, "bindings"):
+        value = {k: v.get("value", "") for k, v in binding.items()}
+        label = control_label(value.get("Control", ""))
+        technique = value.get("Technique", "").strip()
+        if label is None or not technique:
+            continue
+        relation = value.get("Relation") or None
+        ref = value.get("Defensive_Technique") or None
+        values = (label, technique, relation, ref)
+        yield f"d3fend-json:{label}|{technique}", values, lambda lab=label, t=technique, r=relation, u=ref: mapping_triples(namer, lab, t, r, u)
+
+
+SOURCES = {
+    "csf": csf_rows,
+    "sp800_53a": sp800_53a_rows,
+    "d3fend_csv": d3fend_csv_rows,
+    "d3fend_json": d3fend_json_rows,
+}
+
+
+# -------------------------
+# Emission
+# -------------------------
+def _nt_literal(value):
+    return (value.replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def nt_term(term):
+    if isinstance(term, Literal):
+        text = f'"{_nt_literal(str(term))}"'
+        if term.language:
+            return f"{text}@{term.language}"
+        if term.datatype:
+            return f"{text}^^<{term.datatype}>"
+        return text
+    return f"<{term}>"
+
+
+def nt_line(triple):
+    return " ".join(nt_term(t) for t in triple) + " ."
+
+
+def row_digest(values):
+    return hashlib.sha1(json.dumps(values, default=str).encode("utf-8")).hexdigest()
+
+
+def ingest(paths, emit, state=None, namer=None):
+    """Stream every row of ``paths`` (source name -> file) through ``emit``.
+
+    ``namer`` resolves the individuals' URIs (fresh ones by default).
+
+    ``emit(triple, line)`` is called for the triples of new or changed rows.
+    Returns ``(row count, row table, lines to retract)``. Without ``state``
+    nothing is kept per row, so memory stays flat however large the
+    catalogs are, and the table is None. When ``state`` (the previous run's
+    row table) is given, unchanged rows are skipped and the new table is
+    returned for the next run.
+    """
+    namer = namer or Namer()
+    count = 0
+    if state is None:
+        for source, path in paths.items():
+            for _, _, build in SOURCES[source](path, namer):
+                count += 1
+                for triple in build():
+                    emit(triple, nt_line(triple))
+        return count, None, []
+
+    previous = state
+    previous_lines = None
+    rows = {}
+    emitted = set()
+    for source, path in paths.items():
+        for key, values, build in SOURCES[source](path, namer):
+            count += 1
+            digest = row_digest(values)
+            old = previous.get(key)
+            if old is not None and old[0] == digest:
+                rows[key] = old
+                continue
+            triples = build()
+            lines = [nt_line(t) for t in triples]
+            rows[key] = [digest, lines]
+            if previous_lines is None:
+                previous_lines = {line for _, old_lines in previous.values() for line in old_lines}
+            for triple, line in zip(triples, lines):
+                if line not in previous_lines and line not in emitted:
+                    emitted.add(line)
+                    emit(triple, line)
+    current = {line for _, lines in rows.values() for line in lines}
+    removed = sorted({line for _, lines in previous.values() for line in lines} - current)
+    return count, rows, removed
+
+
+def load_state(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("rows", {})
+
+
+def save_state(path, rows):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "rows": rows}, f)
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream NIST CSF / SP 800-53 / D3FEND catalogs into RiskOnto triples.")
+    for name, default in DEFAULT_SOURCES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, default=default,
+                            help=f"source file (default: {default}; pass '' to skip)")
+    parser.add_argument("--nt", help="write emitted triples to this N-Triples file")
+    parser.add_argument("--owl", help="apply the changes to this RDF/XML ontology in place")
+    parser.add_argument("--state", help="row-digest state file for incremental re-ingestion")
+    args = parser.parse_args(argv)
+    if not args.nt and not args.owl:
+        parser.error("nothing to write: pass --nt and/or --owl")
+
+    paths = {name: getattr(args, name) for name in SOURCES if getattr(args, name)}
+    state = load_state(args.state) if args.state else None
+
+    graph = None
+    if args.owl:
+        graph = Graph()
+        graph.parse(args.owl, format="xml")
+    nt_file = open(args.nt, "w", encoding="utf-8") if args.nt else None
+    added = 0
+
+    def emit(triple, line):
+        nonlocal added
+        added += 1
+        if nt_file:
+            nt_file.write(line + "\n")
+        if graph is not None:
+            graph.add(triple)
+
+    try:
+        count, rows, removed = ingest(paths, emit, state, Namer(graph))
+    finally:
+        if nt_file:
+            nt_file.close()
+
+    if removed and args.nt:
+        with open(f"{os.path.splitext(args.nt)[0]}.removed.nt", "w", encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in removed)
+    if graph is not None:
+        if removed:
+            retract = Graph().parse(data="\n".join(removed), format="nt")
+            for triple in retract:
+                graph.remove(triple)
+        graph.serialize(args.owl, format="xml")
+    if args.state:
+        save_state(args.state, rows)
+    print(f"{count} rows, {added} triples added, {len(removed)} retracted", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+# Per-rerun stage instrumentation for the dashboards
+#
+# A PerfRecorder is created at the top of each Streamlit rerun and the script
+# marks its sections with begin()/end() (or the stage() context manager). For
+# every stage it records wall time, the number of triple-pattern probes issued
+# against the graph and the memory allocated while it ran. The dashboards show
+# the result in a "Performance" sidebar expander and append one JSON line per
+# rerun to the file named by RISKONTO_PERF_LOG.
+#
+# Probes are counted per thread, so concurrent Streamlit sessions sharing one
+# Graph do not inflate each other's numbers.
+#
+# Memory tracing is opt-in (RISKONTO_PERF_MEMORY=1): tracemalloc slows every
+# allocation in the process several-fold while it runs. It is also
+# process-wide, and each stage resets the one global peak, so the Allocated
+# and Peak figures are only meaningful with a single session rerunning at a
+# time (profiling locally, not on a shared server). Tracing stops again once
+# the last recorder that needed it has written its rerun or, for a rerun cut
+# short by st.rerun() or a Stop/Rerun exception, has been garbage-collected.
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+import weakref
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+PERF_LOG = os.environ.get("RISKONTO_PERF_LOG")
+TRACE_MEMORY = os.environ.get("RISKONTO_PERF_MEMORY", "0") == "1"
+STAGE_COLUMNS = ["Stage", "Time (ms)", "Triple probes", "Allocated (KiB)", "Peak (KiB)"]
+
+_local = threading.local()
+_lock = threading.Lock()
+_tracing = 0  # recorders that need tracemalloc
+
+
+def _release_tracing():
+    global _tracing
+    with _lock:
+        _tracing -= 1
+        if not _tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def probe_count():
+    return getattr(_local, "probes", 0)
+
+
+def instrument_graph(g):
+    """Count the triples() calls made on ``g`` by the current thread.
+
+    Graph.objects/subjects/value and iteration all go through triples(), so
+    wrapping it on the instance covers every lookup the dashboards make.
+    Safe to call on every rerun; the wrapper is only installed once.
+    """
+    if getattr(g, "_counts_probes", False):
+        return g
+    with _lock:
+        if getattr(g, "_counts_probes", False):
+            return g
+        triples = g.triples
+
+        def counting_triples(triple, *args, **kwargs):
+            _local.probes = getattr(_local, "probes", 0) + 1
+            return triples(triple, *args, **kwargs)
+
+        g.triples = counting_triples
+        g._counts_probes = True
+    return g
+
+
+class PerfRecorder:
+    def __init__(self, dashboard, log_path=PERF_LOG, trace_memory=TRACE_MEMORY):
+        self.dashboard = dashboard
+        self.log_path = log_path
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = datetime.now(timezone.utc)
+        self.stages = []
+        self.context = {}
+        self._open = None
+        self.trace_memory = trace_memory
+        if trace_memory:
+            global _tracing
+            with _lock:
+                _tracing += 1
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+            # Runs once: from write(), or when an interrupted rerun drops the recorder
+            self._release = weakref.finalize(self, _release_tracing)
+
+    # -------------------------
+    # Stage boundaries
+    # -------------------------
+    def begin(self, name):
+        """Start stage ``name``, closing the one currently open."""
+        self.end()
+        mem = tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        self._open = (name, time.perf_counter(), probe_count(), mem)
+
+    def end(self):
+        if self._open is None:
+            return
+        name, start, probes, mem = self._open
+        self._open = None
+        record = {
+            "stage": name,
+            "ms": round((time.perf_counter() - start) * 1000, 3),
+            "probes": probe_count() - probes,
+        }
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            record["alloc_kib"] = round((current - mem) / 1024, 1)
+            record["peak_kib"] = round((peak - mem) / 1024, 1)
+        self.stages.append(record)
+
+    @contextmanager
+    def stage(self, name):
+        self.begin(name)
+        try:
+            yield self
+        finally:
+            self.end()
+
+    # -------------------------
+    # Reporting
+    # -------------------------
+    def total_ms(self):
+        return sum(s["ms"] for s in self.stages)
+
+    def frame(self):
+        return pd.DataFrame(
+            [(s["stage"], s["ms"], s["probes"], s.get("alloc_kib"), s.get("peak_kib")) for s in self.stages],
+            columns=STAGE_COLUMNS,
+        )
+
+    def record(self):
+        return {
+            "ts": self.started.isoformat(),
+            "run_id": self.run_id,
+            "pid": os.getpid(),
+            "dashboard": self.dashboard,
+            **self.context,
+            "total_ms": round(self.total_ms(), 3),
+            "stages": self.stages,
+        }
+
+    def write(self):
+        """Close the open stage and append this rerun to the JSON-lines log, if one is configured."""
+        self.end()
+        if self.trace_memory:
+            self.trace_memory = False
+            self._release()
+        if not self.log_path:
+            return
+        line = json.dumps(self.record(), default=str)
+        with _lock:
+            try:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError:
+                # Losing a metrics line must never break the dashboard
+                pass
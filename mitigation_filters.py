@@ -0,0 +1,81 @@
+# Precomputed filter facets for the "Mapped Mitigations" table
+#
+# The mapped Subcategory -> Control -> Technique frame is built once per index
+# and stored with categorical columns. For every column an inverted index maps
+# each category code to the sorted row ids that carry it, so a filter is the
+# intersection of at most three short id arrays instead of chained boolean
+# masks over copies. Filtered views and the two bar-chart value counts are
+# memoized per (subcategory, control, technique) selection with LRU eviction.
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from ontology_index import per_index_cache
+from reports import mapped_mitigations
+
+ALL = "All"
+SUBCATEGORY, CONTROL, TECHNIQUE = "NIST Subcategory", "NIST Control", "D3FEND Technique"
+FACETS = (SUBCATEGORY, CONTROL, TECHNIQUE)
+VIEW_CACHE_SIZE = 256
+
+
+def _inverted_index(codes, n_categories):
+    # code -> ascending row ids, from one stable argsort
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(n_categories + 1))
+    return [order[bounds[i]:bounds[i + 1]] for i in range(n_categories)]
+
+
+class MitigationFilters:
+    def __init__(self, df):
+        self.frame = pd.DataFrame({
+            col: pd.Categorical(df[col], categories=sorted(df[col].unique())) for col in FACETS
+        }, index=df.index)
+        self.codes = {col: self.frame[col].cat.codes.to_numpy() for col in FACETS}
+        self.categories = {col: list(self.frame[col].cat.categories) for col in FACETS}
+        self.lookup = {col: {v: i for i, v in enumerate(cats)} for col, cats in self.categories.items()}
+        self.inverted = {col: _inverted_index(self.codes[col], len(self.categories[col])) for col in FACETS}
+        self._view = lru_cache(maxsize=VIEW_CACHE_SIZE)(self._compute_view)
+
+    def options(self, col):
+        return [ALL] + self.categories[col]
+
+    def rows(self, subcat=ALL, control=ALL, tech=ALL):
+        """Row positions matching the selection; ``"All"`` leaves a facet unconstrained."""
+        selected = []
+        for col, value in zip(FACETS, (subcat, control, tech)):
+            if value == ALL:
+                continue
+            code = self.lookup[col].get(value)
+            if code is None:
+                return np.empty(0, dtype=np.intp)
+            selected.append(self.inverted[col][code])
+        if not selected:
+            return np.arange(len(self.frame))
+        selected.sort(key=len)
+        result = selected[0]
+        for ids in selected[1:]:
+            result = np.intersect1d(result, ids, assume_unique=True)
+        return result
+
+    def _counts(self, col, rows):
+        counts = np.bincount(self.codes[col][rows], minlength=len(self.categories[col]))
+        series = pd.Series(counts, index=pd.Index(self.categories[col], name=col), name="count")
+        return series[series > 0].sort_values(ascending=False, kind="stable")
+
+    def _compute_view(self, subcat, control, tech):
+        rows = self.rows(subcat, control, tech)
+        return self.frame.iloc[rows], self._counts(CONTROL, rows), self._counts(TECHNIQUE, rows)
+
+    def view(self, subcat=ALL, control=ALL, tech=ALL):
+        """Return (filtered frame, control counts, technique counts) for a selection.
+
+        Results are shared between callers and must not be modified in place.
+        """
+        return self._view(subcat, control, tech)
+
+
+@per_index_cache
+def get_mitigation_filters(idx):
+    return MitigationFilters(mapped_mitigations(idx))
@@ -0,0 +1,319 @@
+# Ontology change feed: triple-level diffs and delta recomputation
+#
+# Two revisions are compared as canonical N-Triples streams: one line per
+# triple, blank nodes relabelled from their content, sorted. A single merge
+# pass over both streams yields the removed and added triples, so a stored
+# canonical dump of last week's revision can be diffed without loading it.
+#
+# ComplianceDelta keeps the compliance state (materialized nonCompliantWith /
+# recommendedMitigation triples, per-tool scores, targeted threats) and applies
+# a changeset to it. Only the tools, controls and threats the changeset names
+# are re-evaluated; the result lists the scores, recommendations and alerts
+# that changed. Declaring or retracting a Control moves every tool's score,
+# since the score is a share of all controls.
+#
+#   python ontology_diff.py old/RiskOnto_v1.owl RiskOnto_v1.owl --out changes.diff
+import argparse
+import os
+import sys
+
+import pandas as pd
+from rdflib import BNode, Graph, Literal, RDF, RDFS
+from rdflib.compare import to_canonical_graph
+
+from inference import ComplianceMaterializer
+from ontology_index import NIST, clean_label, get_index
+from risk import _threat_attributes, is_alert
+
+THREAT_ATTRIBUTES = (NIST.severityLevel, NIST.likelihood, NIST.impact, NIST.riskScore)
+SCORE_COLUMNS = ["Tool", "Old Score (%)", "New Score (%)"]
+RECOMMENDATION_COLUMNS = ["Change", "Tool", "Missing Control", "Suggested Technique"]
+ALERT_COLUMNS = ["Change", "Tool", "Asset", "Threat"]
+
+
+# -------------------------
+# Canonical streams
+# -------------------------
+def _nt(term):
+    # Literal.n3() keeps newlines inside triple quotes; N-Triples needs one line
+    if not isinstance(term, Literal):
+        return term.n3()
+    text = str(term).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+    if term.language:
+        return f'"{text}"@{term.language}'
+    if term.datatype:
+        return f'"{text}"^^<{term.datatype}>'
+    return f'"{text}"'
+
+
+def _line(triple):
+    return " ".join(_nt(term) for term in triple) + " ."
+
+
+def canonical_lines(g):
+    """Sorted N-Triples lines of ``g``; blank nodes get content-derived labels."""
+    lines, blank = [], Graph()
+    for triple in g:
+        if any(isinstance(term, BNode) for term in triple):
+            blank.add(triple)
+        else:
+            lines.append(_line(triple))
+    if len(blank):
+        lines.extend(_line(triple) for triple in to_canonical_graph(blank))
+    lines.sort()
+    return lines
+
+
+def write_canonical(g, path):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in canonical_lines(g):
+            f.write(line + "\n")
+
+
+def _stream(source, format="xml"):
+    # Graph, canonical dump (.nt written by write_canonical) or ontology file
+    if isinstance(source, Graph):
+        return iter(canonical_lines(source))
+    if source.endswith(".nt"):
+        return (line.rstrip("\n") for line in open(source, encoding="utf-8"))
+    from ontology_loader import load_ontology
+
+    return iter(canonical_lines(load_ontology(source, format=format)))
+
+
+def diff_lines(old, new):
+    """Merge two sorted line streams into ("-", line) / ("+", line) pairs."""
+    old, new = iter(old), iter(new)
+    a, b = next(old, None), next(new, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and a < b):
+            yield "-", a
+            a = next(old, None)
+        elif a is None or b < a:
+            yield "+", b
+            b = next(new, None)
+        else:
+            a, b = next(old, None), next(new, None)
+
+
+class Changeset:
+    def __init__(self, removed_lines=(), added_lines=()):
+        self.removed_lines = list(removed_lines)
+        self.added_lines = list(added_lines)
+        self.removed = self._parse(self.removed_lines)
+        self.added = self._parse(self.added_lines)
+
+    @staticmethod
+    def _parse(lines):
+        # Only the changed lines are parsed, never the whole revision
+        g = Graph()
+        if lines:
+            g.parse(data="\n".join(lines), format="nt")
+        return list(g)
+
+    def __len__(self):
+        return len(self.removed) + len(self.added)
+
+    def touched(self):
+        """Subjects and IRI objects of every changed triple."""
+        nodes = set()
+        for s, _, o in self.removed + self.added:
+            nodes.add(s)
+            if not isinstance(o, (BNode, Literal)):
+                nodes.add(o)
+        return nodes
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for line in self.removed_lines:
+                f.write(f"- {line}\n")
+            for line in self.added_lines:
+                f.write(f"+ {line}\n")
+
+    @classmethod
+    def read(cls, path):
+        removed, added = [], []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("- "):
+                    removed.append(line[2:].rstrip("\n"))
+                elif line.startswith("+ "):
+                    added.append(line[2:].rstrip("\n"))
+        return cls(removed, added)
+
+
+def diff(old, new, format="xml"):
+    """Changeset from ``old`` to ``new`` (Graphs, ontology files or canonical .nt dumps)."""
+    removed, added = [], []
+    for sign, line in diff_lines(_stream(old, format), _stream(new, format)):
+        (removed if sign == "-" else added).append(line)
+    return Changeset(removed, added)
+
+
+# -------------------------
+# Delta recomputation
+# -------------------------
+class ComplianceDelta:
+    def __init__(self, g, idx=None):
+        idx = idx or get_index(g)
+        self.materializer = ComplianceMaterializer(g, idx=idx)
+        self.labels = dict(idx.labels)
+        self.targets = dict.fromkeys(idx.pairs(NIST.isTargetedBy))
+        self.threats = {t: _threat_attributes(g, t) for _, t in self.targets}
+        self.scores = {t: self._score(t) for t in self.materializer.implemented}
+
+    def label(self, node):
+        label = self.labels.get(node)
+        return clean_label(label if label is not None else node.split("#")[-1])
+
+    def _score(self, tool):
+        n = len(self.materializer.controls)
+        return len(self.materializer.implemented[tool]) / n * 100 if n else 0.0
+
+    def _recommendations(self, pairs):
+        # (tool, missing control, technique) rows within the (tool, control) scope
+        m = self.materializer
+        return {
+            (tool, c, t)
+            for tool, c in pairs
+            if tool in m.implemented and c in m.control_set and c not in m.implemented[tool]
+            for t in m.mitigations[c]
+        }
+
+    def _alerts(self, tools, threats):
+        # Alerts of ``tools`` on every target plus of every tool on ``threats``
+        alerts = set()
+        for asset, threat in self.targets:
+            sev, _, _, risk = self.threats[threat]
+            candidates = self.scores if threat in threats else tools
+            for tool in candidates:
+                if tool in self.scores and is_alert(risk, sev, self.scores[tool]):
+                    alerts.add((tool, asset, threat))
+        return alerts
+
+    def apply(self, changeset, g):
+        """Move the state to ``g`` (the revision ``changeset`` leads to); return the changed rows."""
+        m = self.materializer
+        m.g = g
+
+        def edges(triples, predicate):
+            return [(s, o) for s, p, o in triples if p == predicate]
+
+        def typed(triples, cls):
+            return [s for s, p, o in triples if p == RDF.type and o == cls]
+
+        tools_added = [t for t in typed(changeset.added, NIST.Tool) if t not in m.implemented]
+        tools_removed = [t for t in typed(changeset.removed, NIST.Tool) if (t, RDF.type, NIST.Tool) not in g]
+        declared = [c for c in typed(changeset.added, NIST.Control) if c not in m.control_set]
+        retracted = [c for c in typed(changeset.removed, NIST.Control) if (c, RDF.type, NIST.Control) not in g]
+        redefined = set(declared) | set(retracted)
+        mitigations_added = [e for e in edges(changeset.added, NIST.hasMitigation) if e[0] not in redefined]
+        mitigations_removed = [e for e in edges(changeset.removed, NIST.hasMitigation) if e[0] not in redefined]
+        implements_added = edges(changeset.added, NIST.implementsControl)
+        implements_removed = edges(changeset.removed, NIST.implementsControl)
+
+        # (tool, control) pairs whose recommendations may move
+        pairs = {(t, c) for t, c in implements_added + implements_removed}
+        for c, _ in mitigations_added + mitigations_removed:
+            pairs.update((t, c) for t, implemented in m.implemented.items() if c not in implemented)
+        pairs.update((t, c) for t in m.implemented for c in redefined)
+        if redefined:
+            tools = set(m.implemented)
+        else:
+            tools = {t for t, _ in implements_added + implements_removed if t in m.implemented}
+        threats = {s for s, p, _ in changeset.removed + changeset.added if p in THREAT_ATTRIBUTES}
+        threats.update(t for _, t in edges(changeset.removed + changeset.added, NIST.isTargetedBy))
+
+        before_scores = {t: self.scores[t] for t in tools | set(tools_removed) if t in self.scores}
+        before_reco = self._recommendations(pairs | {(t, c) for t in tools_removed for c in m.controls})
+        before_alerts = self._alerts(tools | set(tools_removed), threats)
+
+        for s, p, o in changeset.added:
+            if p == RDFS.label:
+                self.labels[s] = g.value(s, RDFS.label)
+        for tool in tools_removed:
+            m.remove_tool(tool)
+            self.scores.pop(tool, None)
+        for c in retracted:
+            m.control_retracted(c)
+        for c in declared:
+            m.control_declared(c, g.objects(c, NIST.hasMitigation))
+        m.add_tools(tools_added)
+        for tool, c in implements_removed:
+            m.control_removed(tool, c)
+        for tool, c in implements_added:
+            if tool in m.implemented:
+                m.control_added(tool, c)
+        for c, t in mitigations_removed:
+            m.mitigation_removed(c, t)
+        for c, t in mitigations_added:
+            m.mitigation_added(c, t)
+
+        for edge in edges(changeset.removed, NIST.isTargetedBy):
+            self.targets.pop(edge, None)
+        for edge in edges(changeset.added, NIST.isTargetedBy):
+            self.targets[edge] = None
+        for t in threats:
+            self.threats.pop(t, None)
+        for _, t in self.targets:
+            if t not in self.threats:
+                self.threats[t] = _threat_attributes(g, t)
+
+        tools = {t for t in tools | set(tools_added) if t in m.implemented}
+        for tool in tools:
+            self.scores[tool] = self._score(tool)
+        pairs.update((t, c) for t in tools_added for c in m.controls)
+        pairs.update((t, c) for t in m.implemented for c in declared)
+        after_reco = self._recommendations(pairs)
+        after_alerts = self._alerts(tools, threats)
+
+        scores = [
+            (self.label(t), before_scores.get(t), self.scores.get(t))
+            for t in sorted(tools | set(tools_removed), key=self.label)
+            if before_scores.get(t) != self.scores.get(t)
+        ]
+        reco = [("removed", *map(self.label, r)) for r in before_reco - after_reco]
+        reco += [("added", *map(self.label, r)) for r in after_reco - before_reco]
+        alerts = [("cleared", *map(self.label, a)) for a in before_alerts - after_alerts]
+        alerts += [("raised", *map(self.label, a)) for a in after_alerts - before_alerts]
+        return {
+            "scores": pd.DataFrame(scores, columns=SCORE_COLUMNS),
+            "recommendations": pd.DataFrame(sorted(reco), columns=RECOMMENDATION_COLUMNS),
+            "alerts": pd.DataFrame(sorted(alerts), columns=ALERT_COLUMNS),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff two RiskOnto revisions and report what the change moves.")
+    parser.add_argument("old", help="ontology file or canonical .nt dump")
+    parser.add_argument("new", help="ontology file")
+    parser.add_argument("--format", default="xml")
+    parser.add_argument("--out", default="changes.diff", help="changeset file (- / + N-Triples lines)")
+    parser.add_argument("--canonical", help="also write the new revision's canonical dump here")
+    parser.add_argument("--reports", help="directory for the changed scores/recommendations/alerts CSVs")
+    args = parser.parse_args(argv)
+
+    from ontology_loader import load_ontology
+
+    new = load_ontology(args.new, format=args.format)
+    changeset = diff(args.old, new, args.format)
+    changeset.write(args.out)
+    if args.canonical:
+        write_canonical(new, args.canonical)
+    print(f"{len(changeset.removed)} removed, {len(changeset.added)} added triples", file=sys.stderr)
+    if args.reports:
+        if args.old.endswith(".nt"):
+            old = Graph()
+            old.parse(args.old, format="nt")
+        else:
+            old = load_ontology(args.old, format=args.format)
+        delta = ComplianceDelta(old).apply(changeset, new)
+        os.makedirs(args.reports, exist_ok=True)
+        for name, df in delta.items():
+            df.to_csv(os.path.join(args.reports, f"{name}.csv"), index=False)
+            print(f"  {name}: {len(df)} changed rows", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+# One-pass lookup index over the ontology graph
+#
+# The dashboard sections resolve labels, types and a handful of object
+# properties thousands of times per rerun. OntologyIndex walks the graph once
+# and answers those lookups from plain dicts.
+import re
+import threading
+import weakref
+from collections import defaultdict, namedtuple
+from functools import wraps
+
+from rdflib import Literal, Namespace, RDF, RDFS, URIRef
+
+NIST = Namespace("http://example.org/riskonto#")
+D3F = Namespace("http://example.org/d3fend#")
+
+INDEXED_PREDICATES = (
+    NIST.hasControl,
+    NIST.hasMitigation,
+    NIST.implementsControl,
+    NIST.isTargetedBy,
+    NIST.isVulnerableTo,
+    NIST.hasCategory,
+    NIST.belongsToCategory,
+    NIST.belongsToFunction,
+    NIST.subcategoryID,
+)
+
+
+# Clean helper
+def clean_label(label):
+    if isinstance(label, Literal):
+        label = str(label)
+    return label.replace("Subcategory for ", "").strip()
+
+
+def is_valid_uri(uri):
+    return isinstance(uri, URIRef) and " " not in uri and "," not in uri
+
+
+CSF_ID = re.compile(r"(?<![A-Z])([A-Z]{2})[._]([A-Z]{2})[-_](\d{2})(?!\d)")
+
+
+def technique_key(node):
+    # D3FEND techniques appear both as Outbound_Traffic_Filtering and OutboundTrafficFiltering
+    return re.sub(r"[^a-z0-9]", "", node.split("#")[-1].lower())
+
+
+class OntologyIndex:
+    def __init__(self, g, predicates=INDEXED_PREDICATES):
+        self.size = len(g)
+        self.labels = {}
+        self.types = defaultdict(list)
+        self.instances = defaultdict(list)
+        self.out = {p: defaultdict(list) for p in predicates}
+        self.inc = {p: defaultdict(list) for p in predicates}
+        self.edges = {p: [] for p in predicates}
+        # Walk only the predicates we need; per-predicate iteration follows
+        # insertion order, so of_type()/pairs() match g.subjects()/g.triples()
+        ambiguous = set()
+        for s, o in g.subject_objects(RDFS.label):
+            if s in self.labels:
+                ambiguous.add(s)
+            else:
+                self.labels[s] = o
+        # Nodes with several labels are resolved the way next(g.objects(...)) does
+        for s in ambiguous:
+            self.labels[s] = next(g.objects(s, RDFS.label))
+        for s, o in g.subject_objects(RDF.type):
+            self.types[s].append(o)
+            self.instances[o].append(s)
+        for p in predicates:
+            for s, o in g.subject_objects(p):
+                self.out[p][s].append(o)
+                self.inc[p][o].append(s)
+                self.edges[p].append((s, o))
+
+    def label(self, node):
+        label = self.labels.get(node)
+        return label if label is not None else node.split("#")[-1]
+
+    def of_type(self, cls):
+        return self.instances.get(cls, [])
+
+    def objects(self, node, predicate):
+        return self.out[predicate].get(node, [])
+
+    def subjects(self, predicate, node):
+        return self.inc[predicate].get(node, [])
+
+    def pairs(self, predicate):
+        return self.edges[predicate]
+
+
+def per_index_cache(factory):
+    """Build ``factory(..., key)`` once per index (or graph) passed last, and share it.
+
+    Entries are kept on the key object itself, so they go away with it, i.e.
+    with the ontology revision. (A WeakKeyDictionary would leak: the values
+    reference their own key.)
+    """
+    lock = threading.Lock()
+
+    @wraps(factory)
+    def get(*args):
+        cache = vars(args[-1]).setdefault("_per_index_cache", {})
+        value = cache.get(get)
+        if value is None:
+            with lock:
+                value = cache.get(get)
+                if value is None:
+                    value = factory(*args)
+                    cache[get] = value
+        return value
+
+    return get
+
+
+_lock = threading.Lock()
+_indexes = weakref.WeakKeyDictionary()
+
+
+def get_index(g):
+    # Rebuilt if the graph has been modified since the index was taken
+    index = _indexes.get(g)
+    if index is not None and index.size == len(g):
+        return index
+    with _lock:
+        index = _indexes.get(g)
+        if index is None or index.size != len(g):
+            index = OntologyIndex(g)
+            _indexes[g] = index
+    return index
+
+
+# -------------------------
+# CSF aliases
+# -------------------------
+# The OWL spreads Functions and SubCategories over several aliases: the typed
+# "Protect" next to "Function_Protect" carrying hasCategory, or
+# "Subcategory_PR_DS_02" (with its Category) next to "PR_DS-02" (with its
+# controls). Functions are merged by label and SubCategories by CSF id, each
+# onto the first typed individual.
+CSFAliases = namedtuple("CSFAliases", ["functions", "subcategories", "canonical", "labels"])
+
+
+def csf_id(idx, node):
+    # "PR.DS-02" from subcategoryID, the label or the local name
+    # (PR_DS-02, Subcategory_PR_DS_02, ...); None when there is no CSF id
+    for text in (*idx.objects(node, NIST.subcategoryID)[:1], idx.label(node), node.split("#")[-1]):
+        match = CSF_ID.search(str(text))
+        if match:
+            return "{}.{}-{}".format(*match.groups())
+    return None
+
+
+def _group(nodes, key):
+    groups = {}
+    for n in dict.fromkeys(nodes):
+        if is_valid_uri(n):
+            groups.setdefault(key(n), []).append(n)
+    return groups
+
+
+@per_index_cache
+def get_csf_aliases(idx):
+    """Alias groups of Functions (by label) and SubCategories (by CSF id).
+
+    ``canonical`` maps every alias to its group's first node; ``labels`` gives
+    merged SubCategories their CSF id as label.
+    """
+    functions = _group(
+        list(idx.of_type(NIST.Function)) + [f for f, _ in idx.pairs(NIST.hasCategory)],
+        lambda f: clean_label(idx.label(f)),
+    )
+    subcategories = _group(
+        list(idx.of_type(NIST.SubCategory))
+        + [s for s, _ in idx.pairs(NIST.belongsToCategory)]
+        + [s for s, _ in idx.pairs(NIST.hasControl)],
+        lambda s: csf_id(idx, s) or s,
+    )
+    canonical = {n: group[0] for groups in (functions, subcategories) for group in groups.values() for n in group}
+    labels = {group[0]: key for key, group in subcategories.items() if not isinstance(key, URIRef)}
+    return CSFAliases(functions, subcategories, canonical, labels)
@@ -0,0 +1,188 @@
+# Cached ontology loading shared by the dashboards
+#
+# Parsing RiskOnto_v1.owl (RDF/XML) dominates every Streamlit rerun. The loader
+# keeps one parsed Graph per source file for the whole process and, on a cold
+# start, rebuilds it from a pickled triple snapshot instead of the XML. The
+# snapshot is keyed on the SHA-256 of the source, so it is only re-parsed when
+# the OWL file actually changes.
+#
+# Setting RISKONTO_STORE=sqlite (or passing store="sqlite") keeps the triples in
+# an indexed SQLite database next to the snapshots instead of in Python objects,
+# one database per source path and digest. A new revision is parsed straight
+# into a fresh database, so the raw triples are never all in memory; the
+# indexes built on top of the graph (ontology_index) still are.
+import hashlib
+import os
+import pickle
+import threading
+import weakref
+
+from rdflib import Graph
+
+SNAPSHOT_VERSION = 2
+SNAPSHOT_DIR = os.environ.get("RISKONTO_CACHE_DIR", ".riskonto_cache")
+STORES = ("memory", "sqlite")
+
+_lock = threading.Lock()
+_digests = {}  # (path, mtime_ns, size) -> sha256 of the file
+_graphs = {}   # (path, sha256, store) -> Graph
+
+
+def file_digest(path):
+    # mtime/size act as a cheap guard so unchanged files are not re-hashed
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    digest = _digests.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _digests[key] = digest
+    return digest
+
+
+def snapshot_path(path, digest):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(SNAPSHOT_DIR, f"{stem}-{digest[:16]}.pickle")
+
+
+class _RecordingGraph(Graph):
+    # Remembers the order the parser adds triples in; list(g) follows the
+    # store's index layout instead, and restoring from that order changes
+    # which value next(g.objects(...)) / next(g.subjects(...)) returns
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.parse_order = []
+
+    def add(self, triple):
+        if self.parse_order is not None:
+            self.parse_order.append(triple)
+        return super().add(triple)
+
+
+def _read_snapshot(snap, digest):
+    try:
+        with open(snap, "rb") as f:
+            payload = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if payload.get("version") != SNAPSHOT_VERSION or payload.get("digest") != digest:
+        return None
+    g = Graph()
+    for prefix, uri in payload["namespaces"]:
+        g.bind(prefix, uri, override=True)
+    # Triples are stored in parse order, so re-adding them rebuilds the store
+    # exactly as a fresh parse does and lookups return values in the same order
+    g.addN((s, p, o, g) for s, p, o in payload["triples"])
+    return g
+
+
+def _write_snapshot(g, snap, digest, mtime):
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "digest": digest,
+        "mtime": mtime,
+        "namespaces": [(prefix, str(uri)) for prefix, uri in g.namespaces()],
+        "triples": g.parse_order,
+    }
+    os.makedirs(os.path.dirname(snap), exist_ok=True)
+    tmp = f"{snap}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, snap)
+    except OSError:
+        # A read-only checkout still works, it just parses on every cold start
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _parse_or_restore(path, digest, format):
+    snap = snapshot_path(path, digest)
+    g = _read_snapshot(snap, digest)
+    if g is None:
+        g = _RecordingGraph()
+        g.parse(path, format=format)
+        _write_snapshot(g, snap, digest, os.stat(path).st_mtime)
+        g.parse_order = None
+    return g
+
+
+def sqlite_path(path, digest):
+    # One database per source file and revision: tenants whose ontologies
+    # share a file name do not share a database, and a rebuild never touches
+    # a database another graph still reads.
+    stem = os.path.splitext(os.path.basename(path))[0]
+    tag = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(SNAPSHOT_DIR, f"{stem}-{tag}-{digest[:16]}.sqlite")
+
+
+def _open_sqlite(path, digest, format):
+    from sqlite_store import SQLiteStore
+
+    db = sqlite_path(path, digest)
+    store = SQLiteStore()
+    if os.path.exists(db):
+        store.open(db)
+        if store.get_meta("digest") == digest:
+            return _sqlite_graph(store)
+        store.close()
+    # Parse straight into a temporary database (no in-memory copy of the
+    # graph) and move it into place once it is complete
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tmp = f"{db}.{os.getpid()}.{threading.get_ident()}.tmp"
+    build = SQLiteStore()
+    build.open(tmp, create=True)
+    try:
+        with build.transaction():
+            Graph(store=build).parse(path, format=format)
+        build.set_meta("digest", digest)
+    finally:
+        build.close()
+    os.replace(tmp, db)
+    store.open(db)
+    return _sqlite_graph(store)
+
+
+def _sqlite_graph(store):
+    # Snapshots of older revisions may still be reading this graph after the
+    # loader has moved on, so the connection is closed when the graph is
+    # garbage-collected rather than when a newer revision is loaded
+    g = Graph(store=store)
+    weakref.finalize(g, store.close)
+    return g
+
+
+def load_ontology(path="RiskOnto_v1.owl", format="xml", store=None):
+    """Return the parsed ontology, reusing the in-process copy or the on-disk snapshot.
+
+    ``store`` selects "memory" (default) or "sqlite"; it falls back to the
+    RISKONTO_STORE environment variable. The returned Graph is shared between
+    callers and must be treated as read-only.
+    """
+    store = store or os.environ.get("RISKONTO_STORE", "memory")
+    if store not in STORES:
+        raise ValueError(f"unknown ontology store {store!r}, expected one of {STORES}")
+    path = os.path.abspath(path)
+    digest = file_digest(path)
+    key = (path, digest, store)
+    g = _graphs.get(key)
+    if g is not None:
+        return g
+    with _lock:
+        g = _graphs.get(key)
+        if g is not None:
+            return g
+        if store == "sqlite":
+            g = _open_sqlite(path, digest, format)
+        else:
+            g = _parse_or_restore(path, digest, format)
+        # Forget older revisions of the same file; whoever still holds one
+        # keeps it usable until they let go of it
+        for stale in [k for k in _graphs if k[0] == path and k[2] == store]:
+            del _graphs[stale]
+        _graphs[key] = g
+    return g
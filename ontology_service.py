@@ -0,0 +1,142 @@
+# Process-wide ontology service shared by all dashboard sessions
+#
+# The service publishes immutable, versioned snapshots (graph + index). A
+# background thread polls the OWL file and, when its content changes, loads
+# and indexes the new revision before swapping it in with a single reference
+# assignment. Sessions pin the snapshot they started with in their session
+# state, so a rerun in flight never sees half of one revision and half of the
+# next; they move to the new version when the user asks for it. Old snapshots
+# are freed once no session pins them any more; with the "sqlite" store each
+# revision has its own database, whose connection closes along with it.
+#
+# ``prepare`` callables run on every new snapshot before it is published, so
+# expensive per-revision state (e.g. the materialized compliance triples) is
+# built by the watcher thread rather than by the first request that needs it.
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from ontology_index import get_index
+from ontology_loader import file_digest, load_ontology
+
+POLL_INTERVAL = float(os.environ.get("RISKONTO_WATCH_INTERVAL", "2.0"))
+
+logger = logging.getLogger(__name__)
+
+OntologySnapshot = namedtuple("OntologySnapshot", ["version", "digest", "path", "graph", "index", "loaded_at"])
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class OntologyService:
+    def __init__(self, path, format="xml", store=None, poll_interval=POLL_INTERVAL, prepare=()):
+        self.path = os.path.abspath(path)
+        self.format = format
+        self.store = store
+        self.prepare = tuple(prepare)
+        self.poll_interval = poll_interval
+        self.session_key = f"riskonto_snapshot:{self.path}"
+        self._reload_lock = threading.Lock()
+        self._snapshot = None
+        self._stat = None
+        self._failed_stat = None
+        self._stop = threading.Event()
+        self._watcher = None
+        self.reload()
+
+    # -------------------------
+    # Snapshots
+    # -------------------------
+    def current(self):
+        return self._snapshot
+
+    def reload(self):
+        """Publish the file's current revision; a no-op when its content is unchanged."""
+        with self._reload_lock:
+            stat = _stat_key(self.path)
+            digest = file_digest(self.path)
+            current = self._snapshot
+            if current is None or current.digest != digest:
+                g = load_ontology(self.path, format=self.format, store=self.store)
+                snapshot = OntologySnapshot(
+                    version=current.version + 1 if current else 1,
+                    digest=digest,
+                    path=self.path,
+                    graph=g,
+                    index=get_index(g),
+                    loaded_at=time.time(),
+                )
+                for fn in self.prepare:
+                    fn(snapshot)
+                self._snapshot = snapshot
+                if current is not None:
+                    logger.info("ontology %s updated to v%d (%s)", self.path, snapshot.version, digest[:12])
+            self._stat = stat
+            self._failed_stat = None
+            return self._snapshot
+
+    # -------------------------
+    # Sessions
+    # -------------------------
+    def pin(self, session_state):
+        """Return the snapshot pinned in ``session_state``, pinning the current one if none is."""
+        snapshot = session_state.get(self.session_key)
+        if snapshot is None:
+            snapshot = self._snapshot
+            session_state[self.session_key] = snapshot
+        return snapshot
+
+    def unpin(self, session_state):
+        session_state.pop(self.session_key, None)
+
+    # -------------------------
+    # File watcher
+    # -------------------------
+    def start(self):
+        if self._watcher is None and self.poll_interval > 0:
+            self._watcher = threading.Thread(target=self._watch, name="riskonto-ontology-watcher", daemon=True)
+            self._watcher.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                stat = _stat_key(self.path)
+            except OSError:
+                continue  # file is being replaced
+            if stat == self._stat or stat == self._failed_stat:
+                continue
+            try:
+                self.reload()
+            except Exception:
+                # Typically a half-written file; keep serving the old snapshot
+                # and retry once the file changes again.
+                self._failed_stat = stat
+                logger.exception("reloading ontology %s failed, keeping v%d", self.path, self._snapshot.version)
+
+
+_lock = threading.Lock()
+_services = {}
+
+
+def get_ontology_service(path="RiskOnto_v1.owl", format="xml", store=None, prepare=()):
+    key = (os.path.abspath(path), store or os.environ.get("RISKONTO_STORE", "memory"))
+    service = _services.get(key)
+    if service is None:
+        with _lock:
+            service = _services.get(key)
+            if service is None:
+                service = OntologyService(path, format=format, store=store, prepare=prepare).start()
+                _services[key] = service
+    return service
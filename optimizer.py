@@ -0,0 +1,236 @@
+# Remediation portfolio optimizer over the control -> technique coverage graph
+#
+# "Smart Recommendations" lists every hasMitigation technique of every missing
+# control. The optimizer instead picks a small (or cheap) set of D3FEND
+# techniques that covers a tool's missing controls, as a weighted set cover:
+#
+#   elements  missing controls that at least one technique mitigates
+#   sets      techniques, each covering the controls it mitigates
+#   weight    control priority (highest subcategoryPriority above it) x
+#             (1 + highest riskScore of a threat its SubCategory/techniques mitigate)
+#
+# Coverage sets are Python int bitsets over the control positions, so a
+# technique's marginal gain is one AND plus a walk over the newly covered bits.
+# The default solver is lazy greedy (weight covered per unit cost, stale heap
+# entries re-scored only when they reach the top), which also yields the
+# ranking of the plan. For small instances an exact minimum-cost cover can be
+# solved with scipy.optimize.milp.
+#
+#   python optimizer.py RiskOnto_v1.owl --tool ToolA --out remediation_plan.csv
+import argparse
+import heapq
+import sys
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from compliance import get_engine
+from ontology_index import NIST, get_index, per_index_cache, technique_key
+from risk_simulation import MITIGATION_PREDICATES
+from rollups import _number, get_rollup
+
+EXACT_MAX_TECHNIQUES = 64
+NO_TECHNIQUE = "notechniquemapped"
+PLAN_COLUMNS = ["Tool", "Rank", "Technique", "Covers", "Controls", "Weight", "Cost", "Cumulative Coverage (%)"]
+
+
+def _atoms(label):
+    # "A, B" -> ["A", "B"], without the "❌ No technique mapped" placeholder
+    parts = (part.strip() for part in str(label).split(","))
+    return [part for part in parts if part and technique_key(part) != NO_TECHNIQUE]
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class RemediationOptimizer:
+    def __init__(self, g, idx, engine=None, rollup=None, costs=None):
+        """``costs`` maps technique labels to a cost (1 when missing)."""
+        engine = engine or get_engine(idx)
+        rollup = rollup or get_rollup(g, idx)
+        self.engine = engine
+        costs = costs or {}
+        control_pos = {c: i for i, c in enumerate(engine.controls)}
+
+        # Control weights: priority of the SubCategories above, boosted by threat risk
+        priority = np.ones(len(engine.controls))
+        for s, w in zip(rollup.nodes["subcategory"], rollup.weights["subcategory"]):
+            for c in rollup.children.get(s, []):
+                i = control_pos.get(c)
+                if i is not None:
+                    priority[i] = max(priority[i], w)
+        # The OWL bundles techniques ("Firmware Verification, Platform
+        # Hardening") and repeats them under several URIs; the optimizer works
+        # on atomic techniques, so a bundle contributes its controls to each
+        # technique it names.
+        mitigation = engine.mitigation.tocsc()
+        controls_of_tech, self.technique_labels = {}, []
+        for j, label in enumerate(engine.technique_labels):
+            rows = mitigation.indices[mitigation.indptr[j]:mitigation.indptr[j + 1]]
+            for part in _atoms(label):
+                key = technique_key(part)
+                if key not in controls_of_tech:
+                    controls_of_tech[key] = set()
+                    self.technique_labels.append(part)
+                controls_of_tech[key].update(int(i) for i in rows)
+        self.technique_labels = np.array(self.technique_labels, dtype=object)
+        risk = np.zeros(len(engine.controls))
+        for threat in idx.of_type(NIST.Threat):
+            score = _number(next(g.objects(threat, NIST.riskScore), None)) or 0.0
+            for p in MITIGATION_PREDICATES:
+                for m in g.objects(threat, p):
+                    canonical = rollup.canonical.get(m, m)
+                    if rollup.level_of.get(canonical) == "subcategory":
+                        rows = [control_pos[c] for c in rollup.children.get(canonical, []) if c in control_pos]
+                    else:
+                        rows = [i for part in _atoms(idx.label(m)) for i in controls_of_tech.get(technique_key(part), ())]
+                    for i in rows:
+                        risk[i] = max(risk[i], score)
+        self.weights = priority * (1 + risk)
+
+        self.masks = [sum(1 << i for i in rows) for rows in controls_of_tech.values()]
+        self.costs = [float(costs.get(label, costs.get(key, 1.0)))
+                      for key, label in zip(controls_of_tech, self.technique_labels)]
+        self.coverable = 0
+        for mask in self.masks:
+            self.coverable |= mask
+        self._plan = lru_cache(maxsize=4096)(self._plan_for_row)
+
+    def missing_mask(self, row):
+        return sum(1 << int(i) for i in self.engine.missing[row].indices)
+
+    def _weight(self, mask):
+        return sum(self.weights[i] for i in _bits(mask))
+
+    # -------------------------
+    # Solvers
+    # -------------------------
+    def greedy(self, target, budget=None):
+        """Lazy greedy cover of ``target``; returns [(technique position, newly covered mask)]."""
+        heap = []
+        for j, mask in enumerate(self.masks):
+            gain = mask & target
+            if gain:
+                heap.append((-self._weight(gain) / self.costs[j], j))
+        heapq.heapify(heap)
+        uncovered, plan, spent = target, [], 0.0
+        while heap and uncovered:
+            _, j = heapq.heappop(heap)
+            gain = self.masks[j] & uncovered
+            if not gain:
+                continue
+            score = -self._weight(gain) / self.costs[j]
+            if heap and score > heap[0][0]:
+                heapq.heappush(heap, (score, j))  # stale: re-queue with its current gain
+                continue
+            if budget is not None and spent + self.costs[j] > budget:
+                continue
+            plan.append((j, gain))
+            spent += self.costs[j]
+            uncovered &= ~gain
+        return plan
+
+    def exact(self, target):
+        """Minimum-cost cover of ``target`` via MILP; None if scipy cannot solve it."""
+        from scipy.optimize import Bounds, LinearConstraint, milp
+
+        candidates = [j for j, mask in enumerate(self.masks) if mask & target]
+        elements = list(_bits(target))
+        if not candidates or not elements:
+            return []
+        A = np.array([[(self.masks[j] >> e) & 1 for j in candidates] for e in elements], dtype=float)
+        res = milp(
+            c=np.array([self.costs[j] for j in candidates]),
+            constraints=LinearConstraint(A, lb=1, ub=np.inf),
+            integrality=np.ones(len(candidates)),
+            bounds=Bounds(0, 1),
+        )
+        if res.x is None:
+            return None
+        # Order the chosen set the greedy way so the plan is still ranked
+        return self._rank([j for j, x in zip(candidates, res.x) if x > 0.5], target)
+
+    def _rank(self, chosen, target):
+        plan, uncovered, chosen = [], target, set(chosen)
+        while chosen and uncovered:
+            j = max(chosen, key=lambda j: (self._weight(self.masks[j] & uncovered) / self.costs[j], -j))
+            chosen.discard(j)
+            gain = self.masks[j] & uncovered
+            if gain:
+                plan.append((j, gain))
+                uncovered &= ~gain
+        return plan
+
+    # -------------------------
+    # Plans
+    # -------------------------
+    def _plan_for_row(self, row, exact, budget):
+        target = self.missing_mask(row) & self.coverable
+        steps = None
+        if exact and budget is None and sum(1 for m in self.masks if m & target) <= EXACT_MAX_TECHNIQUES:
+            steps = self.exact(target)
+        if steps is None:
+            steps = self.greedy(target, budget)
+        total = self._weight(target)
+        tool = self.engine.tool_labels[row]
+        rows, covered = [], 0.0
+        for rank, (j, gain) in enumerate(steps, start=1):
+            weight = self._weight(gain)
+            covered += weight
+            controls = sorted({self.engine.control_labels[i] for i in _bits(gain)})
+            rows.append((tool, rank, self.technique_labels[j], len(controls), ", ".join(controls),
+                         round(weight, 3), self.costs[j], round(covered / total * 100, 2) if total else 100.0))
+        return pd.DataFrame(rows, columns=PLAN_COLUMNS)
+
+    def plan(self, tool_filter="All", exact=False, budget=None):
+        """Ranked remediation plan per tool; memoized per (tool, exact, budget)."""
+        frames = [self._plan(int(row), exact, budget) for row in self.engine.tool_rows(tool_filter)]
+        if not frames:
+            return pd.DataFrame(columns=PLAN_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def uncoverable(self, tool_filter="All"):
+        # Missing controls no technique mitigates; no plan can close them
+        rows = []
+        for row in self.engine.tool_rows(tool_filter):
+            rest = self.missing_mask(row) & ~self.coverable
+            rows.append({"Tool": self.engine.tool_labels[row], "Uncoverable Controls": sum(1 for _ in _bits(rest))})
+        return pd.DataFrame(rows, columns=["Tool", "Uncoverable Controls"])
+
+
+@per_index_cache
+def get_optimizer(g, idx):
+    return RemediationOptimizer(g, idx)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ranked D3FEND remediation plans per tool.")
+    parser.add_argument("ontology", nargs="?", default="RiskOnto_v1.owl")
+    parser.add_argument("--tool", default="All")
+    parser.add_argument("--costs", help="CSV with Technique,Cost columns")
+    parser.add_argument("--budget", type=float, help="stop once this total cost is spent")
+    parser.add_argument("--exact", action="store_true", help=f"MILP cover when <= {EXACT_MAX_TECHNIQUES} techniques apply")
+    parser.add_argument("--out", default="remediation_plan.csv")
+    args = parser.parse_args(argv)
+
+    from ontology_loader import load_ontology
+
+    costs = None
+    if args.costs:
+        df = pd.read_csv(args.costs)
+        costs = dict(zip(df["Technique"].astype(str), df["Cost"].astype(float)))
+    g = load_ontology(args.ontology)
+    optimizer = RemediationOptimizer(g, get_index(g), costs=costs)
+    plan = optimizer.plan(args.tool, exact=args.exact, budget=args.budget)
+    plan.to_csv(args.out, index=False)
+    print(f"{plan['Tool'].nunique()} tools, {len(plan)} plan steps", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
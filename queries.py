@@ -0,0 +1,153 @@
+# Named SPARQL queries over the ontology, prepared once and cached per version
+#
+# Every query is parsed and algebra-translated with rdflib's prepareQuery when
+# it is registered, so issuing it again skips the parser. Results are kept per
+# graph in an LRU keyed by (query name, ontology version, parameters), so a
+# repeated view skips the graph traversal too. Parameters are bound through
+# initBindings, e.g. select(g, "tool_controls", tool=URIRef(...)).
+#
+# The version is whatever identifies the graph's content: the dashboards pass
+# the snapshot digest of the ontology service; it defaults to the triple count,
+# the same staleness check get_index() uses.
+#
+#   python queries.py RiskOnto_v1.owl tool_controls --param tool=http://example.org/riskonto#ToolA
+import argparse
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+from rdflib import Literal, RDF, RDFS, URIRef
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.term import Node
+
+from ontology_index import NIST
+
+CACHE_SIZE = 512
+NAMESPACES = {"nist": NIST, "rdf": RDF, "rdfs": RDFS}
+
+QUERIES = {
+    # Graph Explorer (full graph): SubCategory -> Control -> Technique edges
+    "explorer_edges": """
+        SELECT ?subcat ?control ?technique WHERE {
+            ?subcat a nist:SubCategory .
+            OPTIONAL {
+                ?subcat nist:hasControl ?control .
+                OPTIONAL { ?control nist:hasMitigation ?technique }
+            }
+        }""",
+    # Mapped Mitigations: every (Subcategory, Control, Technique) mapping
+    "mapped_mitigations": """
+        SELECT ?subcat ?control ?technique WHERE {
+            ?control nist:hasMitigation ?technique .
+            ?subcat nist:hasControl ?control .
+        }""",
+    "mitigation_count": """
+        SELECT (COUNT(*) AS ?triples) WHERE { ?control nist:hasMitigation ?technique }""",
+    "tools": """
+        SELECT ?tool WHERE { ?tool a nist:Tool }""",
+    # Tool Compliance / Smart Recommendations
+    "tool_controls": """
+        SELECT ?control WHERE { ?tool nist:implementsControl ?control }""",
+    "missing_controls": """
+        SELECT ?control WHERE {
+            ?control a nist:Control .
+            FILTER NOT EXISTS { ?tool nist:implementsControl ?control }
+        }""",
+    "control_mitigations": """
+        SELECT ?technique WHERE { ?control nist:hasMitigation ?technique }""",
+    # Risk Analysis: one row per isTargetedBy edge with the threat's attributes
+    "targeted_threats": """
+        SELECT ?asset ?threat ?severity ?likelihood ?impact ?risk WHERE {
+            ?asset nist:isTargetedBy ?threat .
+            OPTIONAL { ?threat nist:severityLevel ?severity }
+            OPTIONAL { ?threat nist:likelihood ?likelihood }
+            OPTIONAL { ?threat nist:impact ?impact }
+            OPTIONAL { ?threat nist:riskScore ?risk }
+        }""",
+    "threat_mitigators": """
+        SELECT ?mitigator WHERE {
+            { ?threat nist:isMitigatedBy ?mitigator } UNION { ?threat nist:mitigatedBy ?mitigator }
+        }""",
+}
+
+_prepared = {}
+_lock = threading.Lock()
+_results = weakref.WeakKeyDictionary()
+
+
+def register(name, text):
+    """Parse ``text`` once and make it available as ``name``."""
+    _prepared[name] = prepareQuery(text, initNs=NAMESPACES)
+    QUERIES[name] = text
+
+
+for _name, _text in QUERIES.items():
+    register(_name, _text)
+
+
+def _term(value):
+    if isinstance(value, Node):
+        return value
+    if isinstance(value, str) and "://" in value:
+        return URIRef(value)
+    return Literal(value)
+
+
+def select(g, name, version=None, **params):
+    """Rows of query ``name`` as a DataFrame of rdflib terms, one column per variable.
+
+    Results are shared between callers and must not be modified in place.
+    """
+    if name not in _prepared:
+        raise KeyError(f"unknown query {name!r}; known: {', '.join(sorted(_prepared))}")
+    bindings = {k: _term(v) for k, v in params.items()}
+    key = (name, len(g) if version is None else version, tuple(sorted(bindings.items())))
+    with _lock:
+        cache = _results.setdefault(g, OrderedDict())
+        df = cache.get(key)
+        if df is not None:
+            cache.move_to_end(key)
+            return df
+    result = g.query(_prepared[name], initBindings=bindings)
+    columns = [str(v) for v in result.vars]
+    df = pd.DataFrame([tuple(row) for row in result], columns=columns, dtype=object)
+    with _lock:
+        cache[key] = df
+        if len(cache) > CACHE_SIZE:
+            cache.popitem(last=False)
+    return df
+
+
+def scalar(g, name, version=None, **params):
+    """First value of the first row, as a Python value (None when there is no row)."""
+    df = select(g, name, version, **params)
+    if df.empty or df.iat[0, 0] is None:
+        return None
+    return df.iat[0, 0].toPython()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a named RiskOnto SPARQL query.")
+    parser.add_argument("ontology", nargs="?", default="RiskOnto_v1.owl")
+    parser.add_argument("query", nargs="?", help="query name; omit to list them")
+    parser.add_argument("--param", action="append", default=[], metavar="VAR=VALUE",
+                        help="bind ?VAR (URIs for values containing ://, literals otherwise)")
+    parser.add_argument("--out", help="CSV path (stdout when omitted)")
+    args = parser.parse_args(argv)
+
+    if not args.query:
+        print("\n".join(sorted(QUERIES)))
+        return 0
+    from ontology_loader import load_ontology
+
+    params = dict(p.split("=", 1) for p in args.param)
+    df = select(load_ontology(args.ontology), args.query, **params)
+    df.to_csv(args.out or sys.stdout, index=False)
+    print(f"{args.query}: {len(df)} rows", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# Dashboard analytics as plain functions, plus a headless batch CLI
+#
+# build_reports() produces the same tables the dashboard offers as downloads
+# (recommendations, risk exposure, compliance scores and alerts) without
+# Streamlit. The CLI runs it for many ontology files - one per tenant or
+# business unit - across a process pool and writes CSV and/or Parquet.
+#
+#   python reports.py tenants/*/RiskOnto_v1.owl --out reports --format csv,parquet -j 8
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from compliance import get_engine
+from inference import get_materializer
+from ontology_index import NIST, clean_label, get_index, is_valid_uri
+from risk import build_risk_tables, get_threat_frame
+
+REPORTS = (
+    "xai_tool_mitigations",
+    "risk_exposure_report",
+    "compliance_scores",
+    "compliance_risk_alerts",
+)
+FORMATS = ("csv", "parquet")
+
+
+def mapped_mitigations(idx):
+    # Subcategory -> Control -> D3FEND technique rows behind "Mapped Mitigations"
+    mapped = []
+    for control, technique in idx.pairs(NIST.hasMitigation):
+        if not (is_valid_uri(control) and is_valid_uri(technique)):
+            continue
+        subcat = next(iter(idx.subjects(NIST.hasControl, control)), None)
+        if not subcat or not is_valid_uri(subcat):
+            continue
+        mapped.append({
+            "NIST Subcategory": clean_label(idx.label(subcat)),
+            "NIST Control": clean_label(idx.label(control)),
+            "D3FEND Technique": clean_label(idx.label(technique)),
+        })
+    return pd.DataFrame(mapped, columns=["NIST Subcategory", "NIST Control", "D3FEND Technique"]).drop_duplicates()
+
+
+def build_reports(g, tool_filter="All"):
+    idx = get_index(g)
+    engine = get_engine(idx)
+    rows = engine.tool_rows(tool_filter)
+    df_risk, df_alerts = build_risk_tables(get_threat_frame(g, idx), engine.tool_labels[rows], engine.scores[rows])
+    return {
+        "xai_tool_mitigations": get_materializer(g).recommendation_frame(tool_filter),
+        "risk_exposure_report": df_risk,
+        "compliance_scores": engine.score_frame(tool_filter),
+        "compliance_risk_alerts": df_alerts,
+    }
+
+
+def write_reports(reports, out_dir, formats=("csv",)):
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for name, df in reports.items():
+        for fmt in formats:
+            path = os.path.join(out_dir, f"{name}.{fmt}")
+            if fmt == "csv":
+                df.to_csv(path, index=False)
+            else:
+                df.to_parquet(path, index=False)
+            written.append(path)
+    return written
+
+
+def run_tenant(path, out_dir, formats=("csv",), store=None):
+    # Process-pool entry point: load one ontology and write its reports
+    from ontology_loader import load_ontology
+
+    reports = build_reports(load_ontology(path, store=store))
+    write_reports(reports, out_dir, formats)
+    return {name: len(df) for name, df in reports.items()}
+
+
+def tenant_names(paths):
+    stems = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+    if len(set(stems)) == len(stems):
+        return stems
+    # Same file name in several tenant folders: name them by folder
+    return [f"{os.path.basename(os.path.dirname(os.path.abspath(p)))}_{s}" for p, s in zip(paths, stems)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate RiskOnto compliance/risk/alert reports without Streamlit.")
+    parser.add_argument("ontologies", nargs="*", default=["RiskOnto_v1.owl"], help="one ontology file per tenant")
+    parser.add_argument("--out", default="reports", help="output directory (one sub-folder per tenant)")
+    parser.add_argument("--format", default="csv", help="comma-separated list of: csv, parquet")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--store", choices=("memory", "sqlite"), help="ontology store (default: RISKONTO_STORE)")
+    args = parser.parse_args(argv)
+
+    formats = tuple(f.strip() for f in args.format.split(",") if f.strip())
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+
+    failed = 0
+    names = tenant_names(args.ontologies)
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = {
+            pool.submit(run_tenant, path, os.path.join(args.out, name), formats, args.store): name
+            for path, name in zip(args.ontologies, names)
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                counts = future.result()
+            except Exception as exc:
+                failed += 1
+                print(f"{name}: failed: {exc}", file=sys.stderr)
+                continue
+            summary = ", ".join(f"{report}={n}" for report, n in counts.items())
+            print(f"{name}: {summary}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+# Join-based risk table builder
+#
+# Threat attributes (severityLevel, likelihood, impact, riskScore) are read once
+# per threat into a columnar frame of isTargetedBy edges. The per-tool risk rows
+# are then a single cross join with the compliance scores, and alerts a boolean
+# mask over the joined frame.
+
+import numpy as np
+import pandas as pd
+from rdflib import Literal
+
+from ontology_index import NIST, per_index_cache
+
+ALERT_MESSAGE = "⚠️ High risk threat + low compliance"
+ALERT_MIN_RISK, ALERT_SEVERITY, ALERT_MAX_SCORE = 5.0, "High", 50
+RISK_COLUMNS = ["Tool", "Asset", "Threat", "Severity", "Likelihood", "Impact", "Risk Score"]
+ALERT_COLUMNS = ["Tool", "Asset", "Threat", "Severity", "Risk Score", "Compliance Score (%)", "Alert"]
+
+
+def _threat_attributes(g, threat):
+    sev = next(g.objects(threat, NIST.severityLevel), Literal("Unknown"))
+    lik = next(g.objects(threat, NIST.likelihood), Literal(0.0))
+    imp = next(g.objects(threat, NIST.impact), Literal(0))
+    risk = next(g.objects(threat, NIST.riskScore), Literal(0.0))
+    return str(sev), float(lik), int(imp), float(risk)
+
+
+def build_threat_frame(g, idx):
+    attrs = {}
+    columns = {c: [] for c in RISK_COLUMNS[1:]}
+    for asset, threat in idx.pairs(NIST.isTargetedBy):
+        if threat not in attrs:
+            attrs[threat] = _threat_attributes(g, threat)
+        sev, lik, imp, risk = attrs[threat]
+        columns["Asset"].append(str(idx.label(asset)))
+        columns["Threat"].append(str(idx.label(threat)))
+        columns["Severity"].append(sev)
+        columns["Likelihood"].append(lik)
+        columns["Impact"].append(imp)
+        columns["Risk Score"].append(risk)
+    return pd.DataFrame({
+        "Asset": pd.Series(columns["Asset"], dtype=object),
+        "Threat": pd.Series(columns["Threat"], dtype=object),
+        "Severity": pd.Series(columns["Severity"], dtype=object),
+        "Likelihood": pd.Series(columns["Likelihood"], dtype=float),
+        "Impact": pd.Series(columns["Impact"], dtype=int),
+        "Risk Score": pd.Series(columns["Risk Score"], dtype=float),
+    })
+
+
+def is_alert(risk, severity, score):
+    # Works on scalars and on aligned Series alike
+    return (risk >= ALERT_MIN_RISK) & (severity == ALERT_SEVERITY) & (score < ALERT_MAX_SCORE)
+
+
+def build_risk_tables(threats, tools, scores):
+    """Cross-join tools with targeted threats; return (risk rows, alert rows).
+
+    ``scores`` are the unrounded compliance percentages aligned with ``tools``.
+    """
+    tool_df = pd.DataFrame({"Tool": np.asarray(tools, dtype=object), "_score": np.asarray(scores, dtype=float)})
+    joined = tool_df.merge(threats, how="cross")
+    mask = is_alert(joined["Risk Score"], joined["Severity"], joined["_score"])
+    alerts = joined.loc[mask].reset_index(drop=True)
+    alerts["Compliance Score (%)"] = alerts["_score"].round(2)
+    alerts["Alert"] = ALERT_MESSAGE
+    return joined[RISK_COLUMNS], alerts[ALERT_COLUMNS]
+
+
+@per_index_cache
+def get_threat_frame(g, idx):
+    return build_threat_frame(g, idx)
@@ -0,0 +1,297 @@
+# Monte Carlo risk simulation over the Threat likelihood/impact literals
+#
+# Every exposure edge (Asset isTargetedBy Threat, Component isVulnerableTo
+# Threat) contributes a loss of
+#
+#   likelihood * (1 - effectiveness * coverage) * impact
+#
+# per trial, where likelihood ~ Beta with the stated likelihood as mean and
+# impact ~ lognormal with the stated impact as mean, so the expected loss of an
+# unmitigated edge equals its static riskScore. Coverage is how well a tool
+# covers the threat's isMitigatedBy/mitigatedBy targets: the tool's compliance
+# with a mitigating SubCategory (from the CSF rollup), or 1 for a D3FEND
+# technique reachable through a control the tool implements.
+#
+# In each trial a threat's likelihood and impact are drawn once and shared by
+# every asset it reaches and by every tool, which scales the drawn loss by its
+# (1 - effectiveness * coverage); tools are thus compared on the same random
+# numbers, and the cost is trials x threats draws plus one sparse threats ->
+# assets product per tool and batch. Trials are split into fixed blocks with
+# their own seeded stream; blocks return running sums and per-asset loss
+# histograms, which are merged into one running total as the blocks complete
+# for the mean, standard deviation and VaR percentiles. Histograms are int32
+# and split into (tools, assets) chunks of at most HIST_CELLS counts, so a
+# block's memory does not grow with tools x assets.
+# Blocks can be spread over a process pool and the result does not depend on
+# the worker count.
+#
+#   python risk_simulation.py RiskOnto_v1.owl --trials 100000 -j 8 --out simulation.csv
+import argparse
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from compliance import get_engine
+from ontology_index import NIST, clean_label, get_index, per_index_cache, technique_key
+from rollups import get_rollup
+
+EXPOSURE_PREDICATES = (NIST.isTargetedBy, NIST.isVulnerableTo)
+MITIGATION_PREDICATES = (NIST.isMitigatedBy, NIST.mitigatedBy)
+PERCENTILES = (90, 95, 99)
+CONCENTRATION = 20.0   # Beta a + b: higher means less likelihood uncertainty
+IMPACT_SIGMA = 0.5     # lognormal shape of the impact
+EFFECTIVENESS = 0.8    # share of a threat's likelihood removed at full coverage
+BATCH_CELLS = 1 << 21  # trials x max(threats, assets) cells per NumPy batch
+BLOCK_TRIALS = 10000   # trials per (possibly parallel) block
+HIST_BINS = 2048       # loss histogram resolution per asset
+HIST_CELLS = 1 << 22   # (tool, asset, bin) histogram cells per block: 16 MiB of int32 counts
+UPPER_SIGMAS = 10.0    # histogram range: mean + UPPER_SIGMAS * std of the loss
+RESULT_COLUMNS = ["Tool", "Asset", "Threats", "Static Risk", "Mean Loss", "Std Loss"] + [
+    f"VaR {p}%" for p in PERCENTILES
+]
+
+
+def _simulate_block(task):
+    """Sample one block of trials for every tool; returns (sum, sum of squares, histograms).
+
+    Each is indexed [tool, asset]; the histograms have a trailing HIST_BINS axis.
+    """
+    likelihood, impact, incidence, factors, upper, trials, concentration, sigma, seed = task
+    rng = np.random.default_rng(seed)
+    p = np.clip(likelihood, 1e-6, 1 - 1e-6)
+    a, b = p * concentration, (1 - p) * concentration
+    active = impact > 0
+    mu = np.log(np.where(active, impact, 1.0)) - sigma ** 2 / 2
+    scale = np.where(active, likelihood / p, 0.0)  # undo the clip, drop impact-less threats
+    n_assets, n_threats = incidence.shape
+    n_tools = len(factors)
+    total = np.zeros((n_tools, n_assets))
+    total_sq = np.zeros((n_tools, n_assets))
+    hist = np.zeros(n_tools * n_assets * HIST_BINS, dtype=np.int32)
+    offsets = (np.arange(n_assets) * HIST_BINS)[:, None]
+    width = upper / HIST_BINS
+    batch = max(1, BATCH_CELLS // max(n_threats, n_assets, 1))
+    for lo in range(0, trials, batch):
+        n = min(batch, trials - lo)
+        # One draw per (trial, threat), shared by every tool (common random numbers)
+        draws = rng.beta(a, b, size=(n, n_threats)) * rng.lognormal(mu, sigma, size=(n, n_threats)) * scale
+        for k, factor in enumerate(factors):
+            losses = incidence @ (draws * factor).T  # assets x trials
+            total[k] += losses.sum(axis=1)
+            total_sq[k] += np.square(losses).sum(axis=1)
+            bins = np.minimum((losses / width[k][:, None]).astype(np.int64), HIST_BINS - 1)
+            base = k * n_assets * HIST_BINS
+            hist[base:base + n_assets * HIST_BINS] += np.bincount(
+                (bins + offsets).ravel(), minlength=n_assets * HIST_BINS)
+    return total, total_sq, hist.reshape(n_tools, n_assets, HIST_BINS)
+
+
+def _chunks(n_tools, n_assets):
+    # (tools, assets) slices whose histograms hold at most HIST_CELLS counts,
+    # so a block's memory does not grow with tools x assets
+    assets_per = max(1, min(n_assets, HIST_CELLS // HIST_BINS))
+    tools_per = max(1, HIST_CELLS // (assets_per * HIST_BINS))
+    for a in range(0, n_assets, assets_per):
+        for t in range(0, n_tools, tools_per):
+            yield slice(t, t + tools_per), slice(a, a + assets_per)
+
+
+def _completed(tasks, workers):
+    # (block index, result) in completion order, with at most 2 * workers
+    # blocks in flight, so only a bounded number of histograms is alive at a time
+    if not workers or workers <= 1 or len(tasks) <= 1:
+        for k, task in enumerate(tasks):
+            yield k, _simulate_block(task)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        for k, task in enumerate(tasks):
+            pending[pool.submit(_simulate_block, task)] = k
+            if len(pending) >= 2 * workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        for future in as_completed(list(pending)):
+            yield pending.pop(future), future.result()
+
+
+def _histogram_percentiles(hist, width, percentiles):
+    # Linear interpolation inside the bin holding each percentile
+    cum = np.cumsum(hist, axis=1)
+    trials = cum[:, -1:]
+    out = np.empty((len(hist), len(percentiles)))
+    for j, q in enumerate(percentiles):
+        target = trials[:, 0] * q / 100
+        k = np.argmax(cum >= target[:, None], axis=1)
+        rows = np.arange(len(hist))
+        before = np.where(k > 0, cum[rows, k - 1], 0)
+        frac = (target - before) / np.maximum(hist[rows, k], 1)
+        out[:, j] = (k + frac) * width
+    return out
+
+
+class RiskSimulator:
+    def __init__(self, g, idx, engine=None, rollup=None):
+        engine = engine or get_engine(idx)
+        rollup = rollup or get_rollup(g, idx)
+        self.engine = engine
+
+        edges = list(dict.fromkeys(pair for p in EXPOSURE_PREDICATES for pair in idx.pairs(p)))
+        self.threats = list(dict.fromkeys(t for _, t in edges))
+        self.assets = list(dict.fromkeys(a for a, _ in edges))
+        threat_pos = {t: i for i, t in enumerate(self.threats)}
+        asset_pos = {a: i for i, a in enumerate(self.assets)}
+        rows = [asset_pos[a] for a, _ in edges]
+        cols = [threat_pos[t] for _, t in edges]
+        self.incidence = sparse.csr_matrix((np.ones(len(edges)), (rows, cols)),
+                                           shape=(len(self.assets), len(self.threats)))
+        self.asset_labels = np.array([clean_label(idx.label(a)) for a in self.assets], dtype=object)
+
+        self.likelihood = np.array([self._literal(g, t, NIST.likelihood, 0.0) for t in self.threats])
+        self.impact = np.array([self._literal(g, t, NIST.impact, 0.0) for t in self.threats])
+        self.static_risk = np.array([self._literal(g, t, NIST.riskScore, 0.0) for t in self.threats])
+
+        # tools x threats coverage in [0, 1]: best mitigator the tool has in place
+        tech_pos = {}
+        for j, tech in enumerate(engine.techniques):
+            tech_pos.setdefault(technique_key(tech), []).append(j)
+        implemented_techs = (engine.implements @ engine.mitigation).toarray() > 0
+        self.coverage = np.zeros((len(engine.tools), len(self.threats)))
+        for i, threat in enumerate(self.threats):
+            for p in MITIGATION_PREDICATES:
+                for m in g.objects(threat, p):
+                    scores = rollup.node_scores(m)
+                    if scores is not None:
+                        cov = np.nan_to_num(scores) / 100
+                    elif technique_key(m) in tech_pos:
+                        cov = implemented_techs[:, tech_pos[technique_key(m)]].any(axis=1).astype(float)
+                    else:
+                        continue
+                    self.coverage[:, i] = np.maximum(self.coverage[:, i], cov)
+
+        self._simulate = lru_cache(maxsize=32)(self._run)
+
+    @staticmethod
+    def _literal(g, node, predicate, default):
+        value = next(g.objects(node, predicate), None)
+        try:
+            return float(value) if value is not None else default
+        except ValueError:
+            return default
+
+    def mitigation_factors(self, tool_rows, effectiveness=EFFECTIVENESS):
+        # tools x threats share of the likelihood left after mitigation
+        if tool_rows is None:
+            return np.ones((1, len(self.threats)))
+        return 1 - effectiveness * self.coverage[tool_rows]
+
+    def residual_likelihood(self, tool_row=None, effectiveness=EFFECTIVENESS):
+        if tool_row is None:
+            return self.likelihood
+        return self.likelihood * self.mitigation_factors([tool_row], effectiveness)[0]
+
+    def _upper_bounds(self, factors, concentration, sigma):
+        # Histogram range per tool and asset from the analytic mean and
+        # variance of its loss; a tool scales each threat's loss by its factor
+        p = np.clip(self.likelihood, 0, 1)
+        l_sq = p * (1 - p) / (concentration + 1) + p ** 2
+        i_sq = self.impact ** 2 * np.exp(sigma ** 2)
+        mean = (factors * (p * self.impact)) @ self.incidence.T
+        var = (factors ** 2 * np.maximum(l_sq * i_sq - (p * self.impact) ** 2, 0)) @ self.incidence.T
+        return np.maximum(mean + UPPER_SIGMAS * np.sqrt(var), 1e-9)
+
+    def _run(self, tool_filter, trials, concentration, sigma, effectiveness, seed, workers):
+        rows = None if tool_filter is None else list(self.engine.tool_rows(tool_filter))
+        labels = ["(unmitigated)"] if tool_filter is None else list(self.engine.tool_labels[rows])
+        if not self.assets or not labels or trials <= 0:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        factors = self.mitigation_factors(rows, effectiveness)
+        upper = self._upper_bounds(factors, concentration, sigma)
+        blocks = range(0, trials, BLOCK_TRIALS)
+        seeds = np.random.SeedSequence(seed).spawn(len(blocks))
+        mean, std = np.zeros(upper.shape), np.zeros(upper.shape)
+        var = np.zeros(upper.shape + (len(PERCENTILES),))
+        # Every (tools, assets) chunk replays the same seeded blocks, so all
+        # tools still see the same draws
+        for tools, assets in _chunks(len(factors), len(self.assets)):
+            incidence = self.incidence[assets]
+            tasks = [(self.likelihood, self.impact, incidence, factors[tools], upper[tools, assets],
+                      min(BLOCK_TRIALS, trials - lo), concentration, sigma, seeds[k]) for k, lo in enumerate(blocks)]
+            # Histograms are integer counts, so merging them in completion
+            # order is exact; the float sums are added in block order so the
+            # result does not depend on the worker count either
+            totals, totals_sq, hist = {}, {}, None
+            for k, (total, total_sq, block_hist) in _completed(tasks, workers):
+                totals[k], totals_sq[k] = total, total_sq
+                if hist is None:
+                    hist = block_hist
+                else:
+                    hist += block_hist
+            total = sum(totals[k] for k in sorted(totals))
+            total_sq = sum(totals_sq[k] for k in sorted(totals_sq))
+            mean[tools, assets] = total / trials
+            std[tools, assets] = np.sqrt(np.maximum(total_sq / trials - mean[tools, assets] ** 2, 0))
+            for k, row in enumerate(range(len(factors))[tools]):
+                var[row, assets] = _histogram_percentiles(hist[k], upper[row, assets] / HIST_BINS, PERCENTILES)
+
+        n_threats = np.diff(self.incidence.indptr)
+        static = self.incidence @ self.static_risk
+        frames = []
+        for k, label in enumerate(labels):
+            frame = pd.DataFrame({
+                "Tool": label,
+                "Asset": self.asset_labels,
+                "Threats": n_threats,
+                "Static Risk": static,
+                "Mean Loss": mean[k],
+                "Std Loss": std[k],
+            })
+            for j, p in enumerate(PERCENTILES):
+                frame[f"VaR {p}%"] = var[k, :, j]
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
+
+    def simulate(self, tool_filter="All", trials=10000, concentration=CONCENTRATION, sigma=IMPACT_SIGMA,
+                 effectiveness=EFFECTIVENESS, seed=0, workers=None):
+        """Per (tool, asset) loss statistics; ``tool_filter=None`` simulates without any mitigation.
+
+        Results are memoized per argument set and shared between callers.
+        """
+        return self._simulate(tool_filter, int(trials), float(concentration), float(sigma),
+                              float(effectiveness), int(seed), workers)
+
+
+@per_index_cache
+def get_simulator(g, idx):
+    return RiskSimulator(g, idx)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo per-asset loss simulation for RiskOnto.")
+    parser.add_argument("ontology", nargs="?", default="RiskOnto_v1.owl")
+    parser.add_argument("--tool", default="All", help='tool label, "All", or "none" for no mitigation')
+    parser.add_argument("--trials", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--effectiveness", type=float, default=EFFECTIVENESS)
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--out", default="simulation.csv")
+    args = parser.parse_args(argv)
+
+    from ontology_loader import load_ontology
+
+    g = load_ontology(args.ontology)
+    simulator = RiskSimulator(g, get_index(g))
+    df = simulator.simulate(None if args.tool == "none" else args.tool, trials=args.trials, seed=args.seed,
+                            effectiveness=args.effectiveness, workers=args.jobs)
+    df.to_csv(args.out, index=False)
+    print(f"{len(simulator.assets)} assets, {simulator.incidence.nnz} exposures, {len(df)} rows", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
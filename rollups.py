@@ -0,0 +1,159 @@
+# Priority-weighted compliance rollups over the NIST CSF hierarchy
+#
+#   Function -> Category -> SubCategory -> Control
+#
+# A SubCategory scores the share of its controls a tool implements. Each
+# SubCategory carries its subcategoryPriority as weight (1 when absent), a
+# Category is the weighted mean of its SubCategories and a Function the
+# weighted mean of its Categories, each weighted by the summed priority below
+# it. All tools and all levels are computed in one bottom-up pass of sparse
+# incidence products on top of the compliance engine's tools x controls
+# matrix, and the result is cached per ontology index so drill-downs are plain
+# lookups.
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from compliance import get_engine
+from ontology_index import NIST, clean_label, get_csf_aliases, is_valid_uri, per_index_cache
+
+DEFAULT_PRIORITY = 1.0
+LEVELS = ("function", "category", "subcategory", "control")
+
+
+def _incidence(pairs, shape):
+    rows, cols = zip(*pairs) if pairs else ((), ())
+    return sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=shape)
+
+
+def _number(literal):
+    try:
+        return float(literal)
+    except (TypeError, ValueError):
+        return None
+
+
+def _ratio(num, den):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(den > 0, num / np.where(den > 0, den, 1), np.nan) * 100
+
+
+class CSFRollup:
+    def __init__(self, g, idx, engine=None):
+        engine = engine or get_engine(idx)
+        self.tool_labels = engine.tool_labels
+        self._tool_rows = engine.tool_rows
+
+        # Functions and SubCategories are merged over their aliases (see get_csf_aliases)
+        aliases = get_csf_aliases(idx)
+        function_groups, subcat_groups, canonical = aliases.functions, aliases.subcategories, aliases.canonical
+
+        functions = [group[0] for group in function_groups.values()]
+        categories = list(dict.fromkeys(c for c in idx.of_type(NIST.Category) if is_valid_uri(c)))
+        subcats = [group[0] for group in subcat_groups.values()]
+        controls = engine.controls
+        self.nodes = {"function": functions, "category": categories, "subcategory": subcats, "control": controls}
+        pos = {level: {n: i for i, n in enumerate(nodes)} for level, nodes in self.nodes.items()}
+        self.level_of = {n: level for level, nodes in self.nodes.items() for n in nodes}
+        self.labels = {n: clean_label(idx.label(n)) for nodes in self.nodes.values() for n in nodes}
+        self.labels.update(aliases.labels)
+
+        # Parent -> child edges of the tree, deduplicated, as (child, parent) positions
+        fc = set()
+        for f in (n for group in function_groups.values() for n in group):
+            for c in idx.objects(f, NIST.hasCategory) + idx.subjects(NIST.belongsToFunction, f):
+                if c in pos["category"]:
+                    fc.add((pos["category"][c], pos["function"][canonical[f]]))
+        cs = {
+            (pos["subcategory"][canonical[s]], pos["category"][c])
+            for s, c in idx.pairs(NIST.belongsToCategory) if s in canonical and c in pos["category"]
+        }
+        sc = {
+            (pos["control"][k], pos["subcategory"][canonical[s]])
+            for s, k in idx.pairs(NIST.hasControl) if s in canonical and k in pos["control"]
+        }
+        self.children = {}
+        for level, child_level, edges in (("function", "category", fc), ("category", "subcategory", cs),
+                                          ("subcategory", "control", sc)):
+            parents, kids = self.nodes[level], self.nodes[child_level]
+            for child, parent in sorted(edges, key=lambda e: (e[1], e[0])):
+                self.children.setdefault(parents[parent], []).append(kids[child])
+
+        ctrl_to_sub = _incidence(sorted(sc), (len(controls), len(subcats)))
+        sub_to_cat = _incidence(sorted(cs), (len(subcats), len(categories)))
+        cat_to_fn = _incidence(sorted(fc), (len(categories), len(functions)))
+
+        # Highest priority stated on any alias of the SubCategory
+        priority = np.full(len(subcats), DEFAULT_PRIORITY)
+        for i, group in enumerate(subcat_groups.values()):
+            stated = [_number(v) for s in group for v in g.objects(s, NIST.subcategoryPriority)]
+            stated = [v for v in stated if v is not None]
+            if stated:
+                priority[i] = max(stated)
+
+        # Bottom-up: weighted numerators and weights flow through the incidences
+        implemented = engine.implements.astype(np.float64)
+        n_controls = np.asarray(ctrl_to_sub.sum(axis=0)).ravel()
+        sub_fraction = (implemented @ ctrl_to_sub).toarray() / np.where(n_controls > 0, n_controls, 1)
+        sub_weight = np.where(n_controls > 0, priority, 0.0)
+        sub_num = sub_fraction * sub_weight
+        cat_num = sparse.csr_matrix(sub_num) @ sub_to_cat
+        cat_weight = sub_to_cat.T @ sub_weight
+        fn_num = cat_num @ cat_to_fn
+        fn_weight = cat_to_fn.T @ cat_weight
+
+        self.weights = {
+            "function": fn_weight,
+            "category": cat_weight,
+            "subcategory": sub_weight,
+            "control": np.ones(len(controls)),
+        }
+        self.scores = {
+            "function": _ratio(fn_num.toarray(), fn_weight),
+            "category": _ratio(cat_num.toarray(), cat_weight),
+            "subcategory": _ratio(sub_num, sub_weight),
+            "control": implemented.toarray() * 100,
+        }
+        self.canonical = canonical
+        self._pos = pos
+
+    # -------------------------
+    # Lookups
+    # -------------------------
+    def label(self, node):
+        return self.labels.get(node, str(node))
+
+    def node_scores(self, node):
+        """Per-tool scores of ``node`` or one of its aliases; None when it is not in the tree."""
+        node = self.canonical.get(node, node)
+        level = self.level_of.get(node)
+        if level is None:
+            return None
+        return self.scores[level][:, self._pos[level][node]]
+
+    def scores_frame(self, level="function", tool_filter="All"):
+        """Tools x nodes of ``level``: priority-weighted compliance in percent (NaN when nothing is scored)."""
+        rows = self._tool_rows(tool_filter)
+        return pd.DataFrame(
+            self.scores[level][rows],
+            index=pd.Index(self.tool_labels[rows], name="Tool"),
+            columns=[self.labels[n] for n in self.nodes[level]],
+        )
+
+    def breakdown(self, node, tool_filter="All"):
+        """Children of ``node`` with their weight and per-tool scores."""
+        kids = self.children.get(node, [])
+        rows = self._tool_rows(tool_filter)
+        if not kids:
+            return pd.DataFrame(columns=["Node", "Weight", *self.tool_labels[rows]])
+        level = self.level_of[kids[0]]
+        cols = [self._pos[level][k] for k in kids]
+        df = pd.DataFrame(self.scores[level][np.ix_(rows, cols)].T, columns=self.tool_labels[rows])
+        df.insert(0, "Weight", self.weights[level][cols])
+        df.insert(0, level.capitalize(), [self.labels[k] for k in kids])
+        return df
+
+
+@per_index_cache
+def get_rollup(g, idx):
+    return CSFRollup(g, idx)
@@ -0,0 +1,247 @@
+# Disk-backed rdflib store on SQLite
+#
+# Terms are interned into an integer id table and triples are kept in a
+# WITHOUT ROWID table keyed (s, p, o) with secondary (p, o, s) and (o, s, p)
+# indexes, so every single-pattern lookup the dashboard issues is an index
+# range scan. The database file is memory-mapped and nothing is loaded up
+# front; only the rows a pattern matches are decoded into rdflib terms.
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from rdflib import BNode, Literal, URIRef
+from rdflib.store import Store
+
+MMAP_SIZE = 1 << 30
+TERM_CACHE_SIZE = 1 << 16
+FETCH_SIZE = 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    datatype TEXT NOT NULL DEFAULT '',
+    lang TEXT NOT NULL DEFAULT '',
+    UNIQUE (kind, value, datatype, lang)
+);
+CREATE TABLE IF NOT EXISTS triples (
+    s INTEGER NOT NULL,
+    p INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    PRIMARY KEY (s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s);
+CREATE INDEX IF NOT EXISTS triples_osp ON triples (o, s, p);
+CREATE TABLE IF NOT EXISTS namespaces (prefix TEXT PRIMARY KEY, uri TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def _encode(term):
+    if isinstance(term, Literal):
+        return ("L", str(term), str(term.datatype or ""), term.language or "")
+    if isinstance(term, BNode):
+        return ("B", str(term), "", "")
+    return ("U", str(term), "", "")
+
+
+def _decode(kind, value, datatype, lang):
+    if kind == "L":
+        return Literal(value, datatype=datatype or None, lang=lang or None)
+    if kind == "B":
+        return BNode(value)
+    return URIRef(value)
+
+
+class SQLiteStore(Store):
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, configuration=None, identifier=None):
+        self._conn = None
+        self._lock = threading.RLock()
+        self._ids = {}
+        self._terms = {}
+        super().__init__(configuration, identifier)
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    def open(self, configuration, create=False):
+        self._conn = sqlite3.connect(configuration, check_same_thread=False, isolation_level=None)
+        self._conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if create:
+            self._conn.executescript(SCHEMA)
+        return 1  # rdflib.store.VALID_STORE
+
+    def close(self, commit_pending_transaction=False):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @contextmanager
+    def transaction(self):
+        # One transaction for a bulk load (addN, or a parse straight into the store)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                yield self
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def clear(self):
+        with self._lock:
+            self._conn.executescript("DELETE FROM triples; DELETE FROM terms; DELETE FROM namespaces;")
+            self._ids.clear()
+            self._terms.clear()
+
+    # -------------------------
+    # Term interning
+    # -------------------------
+    def _lookup_id(self, term):
+        key = _encode(term)
+        tid = self._ids.get(key)
+        if tid is None:
+            row = self._conn.execute(
+                "SELECT id FROM terms WHERE kind = ? AND value = ? AND datatype = ? AND lang = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            tid = self._remember(key, row[0])
+        return tid
+
+    def _intern(self, term):
+        tid = self._lookup_id(term)
+        if tid is None:
+            key = _encode(term)
+            tid = self._conn.execute(
+                "INSERT INTO terms (kind, value, datatype, lang) VALUES (?, ?, ?, ?)", key
+            ).lastrowid
+            self._remember(key, tid)
+        return tid
+
+    def _remember(self, key, tid):
+        if len(self._ids) >= TERM_CACHE_SIZE:
+            self._ids.clear()
+        self._ids[key] = tid
+        return tid
+
+    def _term(self, tid):
+        term = self._terms.get(tid)
+        if term is None:
+            row = self._conn.execute(
+                "SELECT kind, value, datatype, lang FROM terms WHERE id = ?", (tid,)
+            ).fetchone()
+            term = _decode(*row)
+            if len(self._terms) >= TERM_CACHE_SIZE:
+                self._terms.clear()
+            self._terms[tid] = term
+        return term
+
+    # -------------------------
+    # Store API
+    # -------------------------
+    def add(self, triple, context, quoted=False):
+        with self._lock:
+            ids = tuple(self._intern(t) for t in triple)
+            self._conn.execute("INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)", ids)
+        super().add(triple, context, quoted)
+
+    def addN(self, quads, batch_size=10000):
+        with self.transaction():
+            batch = []
+            for s, p, o, _ in quads:
+                batch.append((self._intern(s), self._intern(p), self._intern(o)))
+                if len(batch) >= batch_size:
+                    self._conn.executemany("INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)", batch)
+                    batch = []
+            self._conn.executemany("INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)", batch)
+
+    def _where(self, pattern):
+        clauses, params = [], []
+        for column, term in zip("spo", pattern):
+            if term is None:
+                continue
+            tid = self._lookup_id(term)
+            if tid is None:
+                return None, None
+            clauses.append(f"{column} = ?")
+            params.append(tid)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def remove(self, triple, context=None):
+        with self._lock:
+            where, params = self._where(triple)
+            if where is None:
+                return
+            self._conn.execute(f"DELETE FROM triples{where}", params)
+
+    def triples(self, triple_pattern, context=None):
+        # Streams FETCH_SIZE rows at a time; the lock is not held while the
+        # caller consumes a batch
+        with self._lock:
+            where, params = self._where(triple_pattern)
+            if where is None:
+                return
+            cursor = self._conn.execute(f"SELECT s, p, o FROM triples{where}", params)
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(FETCH_SIZE)
+                    decoded = [(self._term(s), self._term(p), self._term(o)) for s, p, o in rows]
+                if not decoded:
+                    return
+                for triple in decoded:
+                    yield triple, iter([None])
+        finally:
+            cursor.close()
+
+    def __len__(self, context=None):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix, namespace, override=True):
+        with self._lock:
+            if not override:
+                row = self._conn.execute("SELECT 1 FROM namespaces WHERE prefix = ? OR uri = ?",
+                                         (prefix, str(namespace))).fetchone()
+                if row:
+                    return
+            self._conn.execute("DELETE FROM namespaces WHERE uri = ?", (str(namespace),))
+            self._conn.execute("INSERT OR REPLACE INTO namespaces (prefix, uri) VALUES (?, ?)",
+                               (prefix, str(namespace)))
+
+    def namespace(self, prefix):
+        with self._lock:
+            row = self._conn.execute("SELECT uri FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def prefix(self, namespace):
+        with self._lock:
+            row = self._conn.execute("SELECT prefix FROM namespaces WHERE uri = ?", (str(namespace),)).fetchone()
+        return row[0] if row else None
+
+    def namespaces(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT prefix, uri FROM namespaces").fetchall()
+        for prefix, uri in rows:
+            yield prefix, URIRef(uri)
@@ -0,0 +1,148 @@
+# Incremental compliance maintenance against a full recomputation
+#
+# ComplianceMaterializer's hooks and ComplianceDelta.apply only touch what an
+# edit names; after random implementsControl / hasMitigation / Control / Tool
+# edits their state must equal a ComplianceMaterializer built from scratch.
+import os
+import random
+import sys
+
+from rdflib import Graph, Literal, RDF, RDFS, URIRef
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference import ComplianceMaterializer  # noqa: E402
+from ontology_diff import ComplianceDelta, diff  # noqa: E402
+from ontology_index import NIST  # noqa: E402
+
+EX = "http://example.org/test#"
+CONTROLS = [URIRef(f"{EX}control{i}") for i in range(12)]
+TECHNIQUES = [URIRef(f"{EX}technique{i}") for i in range(8)]
+TOOLS = [URIRef(f"{EX}tool{i}") for i in range(8)]
+
+
+def build(rng):
+    g = Graph()
+    for node in CONTROLS + TECHNIQUES + TOOLS:
+        g.add((node, RDFS.label, Literal(node.split("#")[-1])))
+    for c in CONTROLS[:8]:
+        g.add((c, RDF.type, NIST.Control))
+    for c in CONTROLS:
+        for t in rng.sample(TECHNIQUES, rng.randint(0, 3)):
+            g.add((c, NIST.hasMitigation, t))
+    for tool in TOOLS[:5]:
+        g.add((tool, RDF.type, NIST.Tool))
+        for c in rng.sample(CONTROLS, rng.randint(0, 6)):
+            g.add((tool, NIST.implementsControl, c))
+    return g
+
+
+def fresh(g):
+    # A copy, so the reference never sees an index cached for the edited graph
+    copy = Graph()
+    for triple in g:
+        copy.add(triple)
+    return ComplianceMaterializer(copy)
+
+
+def frame_rows(m):
+    return sorted(map(tuple, m.recommendation_frame().itertuples(index=False)))
+
+
+def assert_matches(m, g):
+    expected = fresh(g)
+    assert set(m.target) == set(expected.target)
+    assert m.control_set == expected.control_set
+    assert m.implemented == expected.implemented
+    assert frame_rows(m) == frame_rows(expected)
+
+
+def random_edit(g, rng):
+    """Apply one random edit to ``g``; return (kind, subject, object) for the hooks."""
+    kind = rng.choice(["implement", "revoke", "mitigate", "unmitigate", "declare", "retract", "add_tool", "drop_tool"])
+    if kind in ("implement", "revoke"):
+        tool, c = rng.choice(TOOLS), rng.choice(CONTROLS)
+        if kind == "implement":
+            g.add((tool, NIST.implementsControl, c))
+        else:
+            g.remove((tool, NIST.implementsControl, c))
+        return kind, tool, c
+    if kind in ("mitigate", "unmitigate"):
+        c, t = rng.choice(CONTROLS), rng.choice(TECHNIQUES)
+        if kind == "mitigate":
+            g.add((c, NIST.hasMitigation, t))
+        else:
+            g.remove((c, NIST.hasMitigation, t))
+        return kind, c, t
+    if kind in ("declare", "retract"):
+        c = rng.choice(CONTROLS)
+        if kind == "declare":
+            g.add((c, RDF.type, NIST.Control))
+        else:
+            g.remove((c, RDF.type, NIST.Control))
+        return kind, c, None
+    tool = rng.choice(TOOLS)
+    if kind == "add_tool":
+        if (tool, RDF.type, NIST.Tool) in g:
+            return "noop", tool, None
+        g.add((tool, RDF.type, NIST.Tool))
+        for c in rng.sample(CONTROLS, rng.randint(0, 6)):
+            g.add((tool, NIST.implementsControl, c))
+    else:
+        g.remove((tool, None, None))
+    return kind, tool, None
+
+
+def test_materializer_hooks_match_full_recomputation():
+    for seed in range(5):
+        rng = random.Random(seed)
+        g = build(rng)
+        m = ComplianceMaterializer(g)
+        m.recommendation_frame()  # memoized; every hook must drop it
+        for _ in range(60):
+            kind, s, o = random_edit(g, rng)
+            if kind == "implement":
+                if s in m.implemented:  # control_added would adopt an untyped subject
+                    m.control_added(s, o)
+            elif kind == "revoke":
+                m.control_removed(s, o)
+            elif kind == "mitigate":
+                m.mitigation_added(s, o)
+            elif kind == "unmitigate":
+                m.mitigation_removed(s, o)
+            elif kind == "declare":
+                m.control_declared(s, g.objects(s, NIST.hasMitigation))
+            elif kind == "retract":
+                m.control_retracted(s)
+            elif kind == "add_tool":
+                m.add_tools([s])
+            elif kind == "drop_tool":
+                m.remove_tool(s)
+            assert_matches(m, g)
+
+
+def test_implement_and_revoke_edit_the_ontology():
+    rng = random.Random(0)
+    g = build(rng)
+    m = ComplianceMaterializer(g)
+    for _ in range(50):
+        tool, c = rng.choice(TOOLS[:5]), rng.choice(CONTROLS)
+        (m.implement if rng.random() < 0.5 else m.revoke)(tool, c)
+        assert_matches(m, g)
+
+
+def test_delta_apply_matches_full_recomputation():
+    for seed in range(5):
+        rng = random.Random(seed)
+        old = build(rng)
+        delta = ComplianceDelta(old)
+        for _ in range(8):
+            new = Graph()
+            for triple in old:
+                new.add(triple)
+            for _ in range(rng.randint(1, 6)):
+                random_edit(new, rng)
+            delta.apply(diff(old, new), new)
+            assert_matches(delta.materializer, new)
+            assert delta.scores == ComplianceDelta(fresh(new).g).scores
+            old = new